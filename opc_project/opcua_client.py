@@ -1,11 +1,14 @@
-import logging,json,random,argparse,time,sys,os
+import logging,json,random,argparse,time,sys,os,threading,asyncio
 from typing import Any
-from opcua import Client
+from opcua import Client, ua
 from types import TracebackType
 from typing import Self
 from pathlib import Path
 from opcua.ua.uaerrors import UaError
-from opcua_lib import setup_logging
+try:
+    from .opcua_lib import setup_logging, backoff_delay, is_fatal_ua_error, json_loads
+except ImportError:  # Ejecucion directa como script
+    from opcua_lib import setup_logging, backoff_delay, is_fatal_ua_error, json_loads
 
 logger = logging.getLogger(__name__)
 __version__ = "0.1.0"
@@ -13,16 +16,34 @@ __version__ = "0.1.0"
 class SubHandler:
     """Handler para recibir notificaciones de cambios"""
     def datachange_notification(self, node, val, data):
-        # No meter trabajo pesado aquí (bloquea el hilo de callbacks)
-        try:
-            bn = node.get_browse_name()
-        except Exception:
-            bn = None
-        print(f"[DataChange] {bn or node}: {val}")
+        # No meter trabajo pesado aquí (bloquea el hilo de callbacks):
+        # sin get_browse_name, que es una peticion al servidor por notificacion
+        print(f"[DataChange] {node.nodeid.to_string()}: {val}")
 
     def event_notification(self, event):
         print(f"[Event] {event}")
 
+class CacheHandler:
+    """
+    Handler de suscripcion que mantiene el ultimo valor de cada alias.
+
+    Parameters
+    ----------
+    alias_by_nodeid : dict[Any, str]
+        Alias de cada NodeId suscrito.
+    cache : dict[str, Any]
+        Diccionario compartido con `OpcClient` donde se vuelcan los valores.
+    """
+    def __init__(self, alias_by_nodeid: dict[Any, str], cache: dict[str, Any]) -> None:
+        self._alias_by_nodeid = alias_by_nodeid
+        self._cache = cache
+
+    def datachange_notification(self, node, val, data):
+        # Solo una escritura en dict: no bloquea el hilo de callbacks
+        alias = self._alias_by_nodeid.get(node.nodeid)
+        if alias is not None:
+            self._cache[alias] = val
+
 class OpcClientError(RuntimeError):
     """
     Excepción base para todos los errores relacionados con OpcClient.
@@ -58,10 +79,14 @@ class ConnectionError(OpcClientError):
     >>> raise ConnectionError("opc.tcp://localhost:4840", "Timeout de conexión")
     """
     def __init__(self, endpoint: str, message: str, original: Exception | None = None):
-        super().__init__(f"{message} (endpoint={endpoint})")
+        # El mensaje final solo se construye si se llega a pedir con str()
+        super().__init__(endpoint, message)
         self.endpoint = endpoint
         self.original = original
 
+    def __str__(self) -> str:
+        return f"{self.args[1]} (endpoint={self.endpoint})"
+
 class NodeReadError(OpcClientError):
     """
     Error al leer un nodo OPC UA.
@@ -77,13 +102,16 @@ class NodeReadError(OpcClientError):
 
     Uso
     ---
-    >>> raise NodeReadError("ns=2;i=3")
+    >>> raise NodeReadError("ns=2;i=3", "Error de lectura de nodo")
     """
     def __init__(self, nodeid: str, message: str, original: Exception | None = None):
-        super().__init__(f"{message}:{nodeid}")
+        super().__init__(nodeid, message)
         self.nodeid = nodeid
         self.original = original
 
+    def __str__(self) -> str:
+        return f"{self.args[1]}:{self.nodeid}"
+
 class NodeWriteError(OpcClientError):
     """
     Error al escribir en un nodo OPC UA.
@@ -98,10 +126,55 @@ class NodeWriteError(OpcClientError):
         Excepción original capturada (si existe).
     """
     def __init__(self, nodeid: str, message: str, original: Exception | None = None):
-        super().__init__(f"{message}:{nodeid}")
+        super().__init__(nodeid, message)
         self.nodeid = nodeid
         self.original = original
 
+    def __str__(self) -> str:
+        return f"{self.args[1]}:{self.nodeid}"
+
+class _Disconnected:
+    """
+    Objeto nulo que ocupa `OpcClient.client` mientras no hay sesion.
+
+    Cualquier operacion lanza `OpcClientError`, de modo que los metodos de
+    lectura/escritura no necesitan comprobar la conexion antes de cada llamada.
+    """
+    __slots__ = ()
+
+    def _fail(self, *_: Any, **__: Any) -> Any:
+        raise OpcClientError("Cliente no conectado")
+
+    get_node = get_values = set_values = _fail
+    register_nodes = unregister_nodes = create_subscription = _fail
+    read = _fail
+
+    @property
+    def uaclient(self) -> "_Disconnected":
+        # `client.uaclient.read(...)` tambien falla con el mismo error
+        return self
+
+    def __repr__(self) -> str:
+        return "<desconectado>"
+
+_DISCONNECTED = _Disconnected()
+
+def _variant_type_of(dv: ua.DataValue) -> ua.VariantType | None:
+    """
+    Traduce el atributo DataType leido de un nodo a su `ua.VariantType`.
+
+    Solo los tipos basicos (ns=0, i=1..21) tienen un VariantType con el mismo
+    identificador; para el resto se devuelve `None` y `python-opcua` infiere
+    el tipo a partir del valor Python.
+    """
+    if not dv.StatusCode.is_good():
+        return None
+    nodeid = dv.Value.Value
+    ident = getattr(nodeid, "Identifier", None)
+    if getattr(nodeid, "NamespaceIndex", None) == 0 and isinstance(ident, int) and 1 <= ident <= 21:
+        return ua.VariantType(ident)
+    return None
+
 '''
 ¿Por qué ConnectionError y NodeReadError no heredan directamente de 'RuntimeError'?
 
@@ -121,8 +194,26 @@ class OpcClient:
 
     Esta clase encapsula las operaciones básicas de un cliente OPC UA:
     conexión, desconexión y gestión del estado de la sesión.
+
+    Las instancias con el mismo `endpoint_url` comparten una única sesión
+    (`opcua.Client`) con contador de referencias: solo la primera paga el
+    handshake y solo la última en desconectarse cierra la sesión.
     """
 
+    # Atributos fijos por instancia: sin __dict__ y acceso directo por descriptor
+    __slots__ = ("endpoint_url", "client", "_aliases", "_nodes", "_registered",
+                 "_subscription", "_value_cache", "_nodeids", "_alias_set", "_nodeids_get", "_nodes_get",
+                 "_read_params", "_vtypes")
+
+    # Sesiones compartidas por endpoint: {endpoint_url: (Client, referencias)}
+    _pool: dict[str, tuple[Client, int]] = {}
+    _pool_lock = threading.Lock()
+    # Un lock por endpoint para el handshake: abrir una sesion lenta (reintentos)
+    # no bloquea las conexiones a otros endpoints
+    _open_locks: dict[str, threading.Lock] = {}
+    # Maximo de combinaciones de alias con peticion Read precalculada
+    _READ_PARAMS_MAX = 32
+
     def __init__(self, endpoint_url: str)-> None: 
         """
         Inicializa una nueva instancia de OpcClient.
@@ -137,26 +228,52 @@ class OpcClient:
         ----------
         endpoint_url : str
             URL de conexión fija del cliente (no debe cambiar tras la construcción).
-        client : Client or None
+        client : Client or _Disconnected
             Instancia de `opcua.Client` activa si existe conexión,
-            o `None` si el cliente está desconectado.
+            o el objeto nulo `_DISCONNECTED` si el cliente está desconectado.
         aliases : dict[str, str]
             Alias de nodos conocidos.
         nodes: dict[str,Any]
             Nodos conocidos resueltos.        
+        registered: bool
+            Indica si los nodos de `nodes` estan registrados en el servidor.
+        value_cache: dict[str,Any] or None
+            Ultimos valores recibidos por suscripcion, o `None` si la cache
+            no esta activa (ver `enable_cache`).
         """
 
         # Configuracion fija
         self.endpoint_url: str = endpoint_url
         # Estado
-        self.client: Client | None = None
+        self.client: Client | _Disconnected = _DISCONNECTED
         self._aliases: dict[str,str] = {}
+        self._nodeids: dict[str,ua.NodeId] = {}
         self._nodes: dict[str,Any] = {}
-
-    def connect(self, retries: int = 3, backoff_s: float = 1.0) -> bool:
+        self._nodes_get = self._nodes.get  # _nodes solo se muta, nunca se reasigna
+        self._bind_aliases()
+        self._registered: bool = False
+        self._subscription: Any = None
+        self._value_cache: dict[str,Any] | None = None
+        self._read_params: dict[tuple[str,...], ua.ReadParameters] = {}
+        # VariantType de cada alias para escribir sin inferir el tipo
+        self._vtypes: dict[str, ua.VariantType | None] = {}
+
+    def connect(self, retries: int = 3, backoff_s: float = 1.0,
+                max_delay_s: float = 30.0, jitter: float = 0.5) -> bool:
         """
         Establece la conexión con el servidor OPC UA.
 
+        Parameters
+        ----------
+        retries : int
+            Numero de intentos de conexion.
+        backoff_s : float
+            Espera base entre intentos; se duplica en cada fallo.
+        max_delay_s : float
+            Espera maxima entre intentos.
+        jitter : float
+            Fraccion aleatoria añadida a cada espera.
+
         Returns
         -------
         bool
@@ -171,24 +288,89 @@ class OpcClient:
         if self.is_connected:
             logger.info('Conexion ya establecida a %s',self.endpoint_url)
             return True
-        
+
+        while True:
+            with OpcClient._pool_lock:
+                open_lock = OpcClient._open_locks.setdefault(self.endpoint_url, threading.Lock())
+            with open_lock:
+                with OpcClient._pool_lock:
+                    if OpcClient._open_locks.get(self.endpoint_url) is not open_lock:
+                        continue # Lock retirado al cerrar la sesion mientras se esperaba
+                    shared = OpcClient._pool.get(self.endpoint_url)
+                if shared is not None and not self._session_alive(shared[0]):
+                    # Sesion caida: se saca del pool; cada instancia que la usaba
+                    # cierra su referencia al desconectarse
+                    logger.warning("Sesion compartida a %s caida; se abre una nueva", self.endpoint_url)
+                    with OpcClient._pool_lock:
+                        if OpcClient._pool.get(self.endpoint_url) is shared:
+                            OpcClient._pool.pop(self.endpoint_url)
+                with OpcClient._pool_lock:
+                    shared = OpcClient._pool.get(self.endpoint_url)
+                    if shared is not None:
+                        client, refs = shared
+                        OpcClient._pool[self.endpoint_url] = (client, refs + 1)
+                        self.client = client
+                        logger.info("Reutilizada sesion compartida a %s (%d referencias)", self.endpoint_url, refs + 1)
+                if shared is None:
+                    # Handshake fuera del lock global; open_lock evita abrir dos sesiones al mismo endpoint
+                    client = self._open_session(retries, backoff_s, max_delay_s, jitter)
+                    with OpcClient._pool_lock:
+                        OpcClient._pool[self.endpoint_url] = (client, 1)
+                    self.client = client
+            break
+
+        self._register_all()
+        return True
+
+    @staticmethod
+    def _session_alive(client: Client) -> bool:
+        """
+        Comprueba con una lectura de `ServerStatus.State` que una sesion
+        compartida sigue activa antes de reutilizarla.
+        """
+        try:
+            state = client.get_node(ua.NodeId(ua.ObjectIds.Server_ServerStatus_State)).get_value()
+        except Exception as exc:
+            logger.debug("Sesion compartida sin respuesta: %s", exc)
+            return False
+        return state == ua.ServerState.Running
+
+    def _open_session(self, retries: int, backoff_s: float, max_delay_s: float, jitter: float) -> Client:
+        """
+        Metodo privado que abre una sesion nueva con reintentos y backoff
+        exponencial con jitter.
+
+        Raises
+        ------
+        ConnectionError
+            Si se agotan los intentos de conexión o el servidor rechaza
+            la sesion (credenciales o permisos), sin reintentar.
+        """
+        # Se conserva el nombre de host: socket.create_connection prueba
+        # todas las direcciones (IPv4 e IPv6) que devuelva el DNS
+        # La instancia se reutiliza entre intentos: Client.connect limpia
+        # el socket si falla y crea uno nuevo en el siguiente intento
+        tmp = Client(self.endpoint_url)
         last_exc: Exception | None = None
         for attempt in range(1,retries+1):
             try:
-                tmp = Client(self.endpoint_url)
                 tmp.connect()
-                self.client = tmp
                 logger.info("Conexion existosa a %s", self.endpoint_url)
-                return True
+                return tmp
             except Exception as exc:
                 last_exc = exc
+                if is_fatal_ua_error(exc):
+                    # Reintentar no cambia credenciales ni permisos
+                    logger.error("Conexion a %s rechazada: %s", self.endpoint_url, exc)
+                    self.client = _DISCONNECTED
+                    raise ConnectionError(self.endpoint_url, "Conexión rechazada por el servidor.", original=exc) from exc
                 if attempt < retries:
                     logger.warning("Intento %d/%d falló: %s", attempt, retries, exc)
-                    time.sleep(backoff_s * attempt)
+                    time.sleep(backoff_delay(attempt, backoff_s, max_delay_s, jitter))
                 else:
                     logger.error("Error al conectar a %s tras %d intentos", self.endpoint_url, retries)
                     # Asegura estado consistente
-                    self.client = None
+                    self.client = _DISCONNECTED
         raise ConnectionError(self.endpoint_url, "Se han agotado los intentos de conexión.", original=last_exc)
 
     def disconnect(self) -> None:
@@ -196,11 +378,28 @@ class OpcClient:
         Cierra la conexión con el servidor OPC UA.
 
         Si existe un cliente activo, lo desconecta y lo establece en None.
+        Si la sesion es compartida con otras instancias solo se libera la
+        referencia; la sesion se cierra al liberar la ultima.
         """
         if not self.is_connected:
             logger.info("Desconexión solicitada sin conexión activa.")
             return
+        self.disable_cache()
+        self._unregister_all()
         try:
+            with OpcClient._pool_lock:
+                client, refs = OpcClient._pool.get(self.endpoint_url, (self.client, 1))
+                if refs > 1 and client is self.client:
+                    OpcClient._pool[self.endpoint_url] = (client, refs - 1)
+                    logger.info("Liberada sesion compartida a %s (%d referencias)", self.endpoint_url, refs - 1)
+                    return
+                if client is self.client:
+                    OpcClient._pool.pop(self.endpoint_url, None)
+                    lock = OpcClient._open_locks.get(self.endpoint_url)
+                    if lock is not None and not lock.locked():
+                        # Sin sesion no hace falta serializar aperturas; connect
+                        # descarta el lock si otro hilo ya lo habia obtenido
+                        OpcClient._open_locks.pop(self.endpoint_url)
             uac = getattr(self.client, "uaclient", None)
             if uac and hasattr(uac, "disconnect_socket"):
                 self.client.disconnect() # type: ignore
@@ -210,8 +409,10 @@ class OpcClient:
         except Exception as exc:
             logger.exception("Error al desconectar: %s", exc)
         finally:
-            self.client = None
+            self.client = _DISCONNECTED
             self._nodes.clear() # Los nodos resueltos quedan ligados a la sesion
+            self._read_params.clear()
+            self._vtypes.clear()
 
     def read_node(self, alias: str) -> Any:
         """
@@ -232,14 +433,21 @@ class OpcClient:
         NodeReadError
             Si ocurre un fallo al acceder o leer el nodo.
         """
-        if not self.is_connected: raise OpcClientError("Cliente no conectado")
-        t0 = time.perf_counter()
+        # Sin comprobacion de conexion: sin sesion, `_DISCONNECTED` lanza el error
+        # Valor servido por la suscripcion, sin ida y vuelta al servidor
+        cache = self._value_cache
+        if cache is not None and alias in cache:
+            return cache[alias]
+        # El temporizador solo se consulta si el nivel DEBUG esta activo
+        dbg = logger.isEnabledFor(logging.DEBUG)
+        t0 = time.perf_counter() if dbg else 0.0
         try:
             val = self._get_node_by_alias(alias).get_value()
-            logger.debug("Leído %s => %r (%.2f ms)", alias, val, (time.perf_counter()-t0)*1000)
+            if dbg:
+                logger.debug("Leído %s => %r (%.2f ms)", alias, val, (time.perf_counter()-t0)*1000)
             return val
         except Exception as exc:
-            raise NodeReadError(f"Error de lectura de nodo: {alias}",original=exc) from exc     # type: ignore
+            raise NodeReadError(alias, "Error de lectura de nodo", original=exc) from exc
 
     def write_node(self, alias: str, value: Any) -> None:
         """
@@ -260,26 +468,161 @@ class OpcClient:
             - Error de transporte o sistema (timeout, desconexión, etc.).
             El detalle original estará en `e.original`.
         """
-        if not self.is_connected:
-            raise OpcClientError("Cliente no conectado")
         try:
             node = self._get_node_by_alias(alias)
-            node.set_value(value)
-            logger.debug("Escrito %s <= %r", alias, value)
+            # Con el tipo del nodo: un int de Python no convierte un Int16 en Int64
+            node.set_value(value, self._variant_types((alias,))[0])
+            # Escritura aceptada (set_value lanza si el StatusCode no es Good):
+            # la cache no espera a la notificacion para reflejar el valor
+            cache = self._value_cache
+            if cache is not None and alias in cache:
+                cache[alias] = value
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Escrito %s <= %r", alias, value)
         except UaError as exc:
             raise NodeWriteError(alias, f"Error UA al escribir", original=exc) from exc
         except Exception as exc:
             # Otros fallos (transporte, timeout, etc.)
             raise NodeWriteError(alias, "Error de transporte al escribir", original=exc) from exc
 
-    def load_aliases_from_json(self,file_path: str) -> None:
+    def read_nodes(self, aliases: list[str]) -> dict[str, Any]:
+        """
+        Lee el valor actual de varios nodos en una sola petición Read.
+
+        Parameters
+        ----------
+        aliases : list[str]
+            BrowseNames de los nodos.
+
+        Returns
+        -------
+        dict[str, Any]
+            Valores leidos indexados por alias.
+
+        Raises
+        ------
+        NodeReadError
+            Si ocurre un fallo al acceder o leer alguno de los nodos, o si el
+            servidor devuelve un StatusCode no valido para alguno de ellos
+            (`e.nodeid` contiene solo los alias rechazados).
+        """
+        if not aliases:
+            return {}
+        dbg = logger.isEnabledFor(logging.DEBUG)
+        t0 = time.perf_counter() if dbg else 0.0
+        try:
+            # En un bucle de sondeo se repiten siempre los mismos alias:
+            # los ReadValueId se construyen una vez y se reutilizan
+            key = tuple(aliases)
+            params = self._read_params.get(key)
+            if params is None:
+                params = self._build_read_params(key)
+            results = self.client.uaclient.read(params) # type: ignore
+            if dbg:
+                logger.debug("Leídos %d nodos (%.2f ms)", len(results), (time.perf_counter()-t0)*1000)
+        except Exception as exc:
+            raise NodeReadError(",".join(aliases), "Error de lectura en bloque", original=exc) from exc
+        # Cada resultado lleva su propio StatusCode: un nodo malo no invalida la peticion
+        failed = [alias for alias, dv in zip(aliases, results) if not dv.StatusCode.is_good()]
+        if failed:
+            bad = results[aliases.index(failed[0])].StatusCode
+            raise NodeReadError(",".join(failed), f"Lectura en bloque rechazada ({bad.name})")
+        return dict(zip(aliases, [dv.Value.Value for dv in results]))
+
+    def write_nodes(self, values: dict[str, Any]) -> None:
+        """
+        Escribe varios nodos en una sola petición Write.
+
+        Parameters
+        ----------
+        values : dict[str, Any]
+            Valores a escribir indexados por alias.
+
+        Raises
+        ------
+        NodeWriteError
+            Si ocurre un fallo al escribir alguno de los nodos. El detalle
+            original estará en `e.original`.
+        """
+        if not values:
+            return
+        aliases = ",".join(values)
+        try:
+            cached = self._nodes_get
+            resolve = self._get_node_by_alias
+            nodes = [cached(alias) or resolve(alias) for alias in values]
+            variants = [ua.Variant(value, vtype) for value, vtype in zip(values.values(), self._variant_types(values))]
+            self.client.set_values(nodes, variants) # type: ignore
+            cache = self._value_cache
+            if cache is not None:
+                cache.update({alias: value for alias, value in values.items() if alias in cache})
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Escritos %d nodos", len(nodes))
+        except UaError as exc:
+            raise NodeWriteError(aliases, "Error UA al escribir en bloque", original=exc) from exc
+        except Exception as exc:
+            raise NodeWriteError(aliases, "Error de transporte al escribir en bloque", original=exc) from exc
+
+    def enable_cache(self, period_ms: int = 200) -> None:
+        """
+        Suscribe todos los alias cargados y sirve `read_node` desde una cache
+        local actualizada por notificaciones DataChange.
+
+        Tras la suscripcion el servidor envia el valor inicial de cada nodo;
+        hasta que llega, `read_node` sigue leyendo del servidor.
+
+        Parameters
+        ----------
+        period_ms : int
+            Intervalo de publicacion de la suscripcion en milisegundos.
+
+        Raises
+        ------
+        OpcClientError
+            Si el cliente no esta conectado, no hay alias cargados
+            o falla la creacion de la suscripcion.
+        """
+        if not self.is_connected:
+            raise OpcClientError("Cliente no conectado")
+        if not self._aliases:
+            raise OpcClientError("No hay alias cargados para suscribir")
+        if self._value_cache is not None:
+            logger.info("Cache de valores ya activa en %s", self.endpoint_url)
+            return
+
+        cache: dict[str, Any] = {}
+        try:
+            nodes = [self._get_node_by_alias(alias) for alias in self._aliases]
+            handler = CacheHandler({node.nodeid: alias for alias, node in zip(self._aliases, nodes)}, cache)
+            sub = self.client.create_subscription(period_ms, handler) # type: ignore
+            sub.subscribe_data_change(nodes)
+        except Exception as exc:
+            raise OpcClientError(f"Error al crear la suscripcion de cache en {self.endpoint_url}") from exc
+        self._subscription = sub
+        self._value_cache = cache
+        logger.info("Cache de valores activa para %d nodos (%d ms)", len(nodes), period_ms)
+
+    def disable_cache(self) -> None:
+        """
+        Elimina la suscripcion de la cache de valores. Idempotente.
+        """
+        sub, self._subscription = self._subscription, None
+        self._value_cache = None
+        if sub is None:
+            return
+        try:
+            sub.delete()
+        except Exception as exc:
+            logger.warning("Error al eliminar la suscripcion de cache: %s", exc)
+
+    def load_aliases_from_json(self,file_path: str | Path) -> None:
         """
         Carga los browsename y nodeid conocidos desde un JSON exportado
         directamente del servidor.
 
         Parameters
         ----------
-        file_path : str
+        file_path : str or Path
             Ruta al archivo JSON.
 
         Raises
@@ -289,25 +632,43 @@ class OpcClient:
         """
 
         # Se invalida cache de nodos si se cambia de alias
+        self.disable_cache()
+        self._unregister_all()
         self._nodes.clear()
+        self._read_params.clear()
+        self._vtypes.clear()
+        nodeids: dict[str,ua.NodeId] = {}
         try:
             logger.info("Inicio de carga de alias desde %s", file_path)
-            with open(Path(file_path), "r", encoding="utf-8") as archivo:
-                self._aliases = json.load(archivo)
+            raw = Path(file_path).read_bytes()
+            self._aliases = json_loads(raw)
+            # Los NodeIds se parsean una sola vez; get_node recibe el objeto ya construido
+            nodeids = {alias: ua.NodeId.from_string(nodeid) for alias, nodeid in self._aliases.items()}
             logger.info("Cargados %d alias desde %s", len(self._aliases), file_path)
 
         except FileNotFoundError as exc:
             self._aliases = {}
             raise OpcClientError(f"No se encuentra el JSON de alias en {file_path}") from exc
 
-        except json.JSONDecodeError as exc:
+        except json.JSONDecodeError as exc:  # orjson.JSONDecodeError hereda de esta
             self._aliases = {}
             raise OpcClientError(f"El archivo {file_path} no contiene JSON válido") from exc
 
+        except UaError as exc:
+            self._aliases = {}
+            raise OpcClientError(f"El archivo {file_path} contiene NodeIds inválidos") from exc
+
         except Exception as exc:
             self._aliases = {}
             raise OpcClientError(f"Error inesperado al leer {file_path}") from exc
 
+        finally:
+            self._nodeids = nodeids
+            self._bind_aliases()
+
+        # Con sesion activa se registran los nuevos nodos
+        self._register_all()
+
     def __enter__(self) -> Self:
         """
         Método especial del protocolo de context manager.
@@ -346,6 +707,108 @@ class OpcClient:
 
         self.disconnect()
 
+    async def __aenter__(self) -> Self:
+        """
+        Versión asíncrona de `__enter__`.
+
+        `python-opcua` es síncrono: la conexión se ejecuta en un hilo
+        para no bloquear el bucle de eventos.
+        """
+        await asyncio.to_thread(self.connect)
+        return self
+
+    async def __aexit__(self, exc_type:type[BaseException] | None, exc:BaseException | None, tb:TracebackType | None) -> None:
+        """
+        Versión asíncrona de `__exit__`: desconecta en un hilo.
+        """
+        await asyncio.to_thread(self.disconnect)
+
+    def _bind_aliases(self) -> None:
+        '''
+        Metodo privado que precalcula las estructuras de acceso a los alias
+        cargados: conjunto inmutable para validar y `__getitem__` enlazado
+        a los NodeIds ya parseados. Se llama cada vez que se reasigna `_aliases`.
+        '''
+        self._alias_set = frozenset(self._aliases)
+        self._nodeids_get = self._nodeids.__getitem__
+
+    def _build_read_params(self, key: tuple[str,...]) -> ua.ReadParameters:
+        '''
+        Metodo privado que construye y guarda la peticion Read del atributo
+        Value para los alias de `key`. Se invalida al cambiar los NodeIds
+        (registro, recarga de alias o desconexion).
+        '''
+        # Locales: evita re-acceder a atributos de self en cada alias
+        cached = self._nodes_get
+        resolve = self._get_node_by_alias
+        params = ua.ReadParameters()
+        for alias in key:
+            rv = ua.ReadValueId()
+            rv.NodeId = (cached(alias) or resolve(alias)).nodeid
+            rv.AttributeId = ua.AttributeIds.Value
+            params.NodesToRead.append(rv)
+        if len(self._read_params) >= self._READ_PARAMS_MAX:
+            self._read_params.clear()
+        self._read_params[key] = params
+        return params
+
+    def _variant_types(self, aliases) -> list[ua.VariantType | None]:
+        '''
+        Metodo privado que devuelve el VariantType de cada alias segun el
+        atributo DataType del nodo. Los alias aun desconocidos se leen en
+        una sola peticion Read y se guardan en `_vtypes`.
+        '''
+        vtypes = self._vtypes
+        missing = [alias for alias in aliases if alias not in vtypes]
+        if missing:
+            cached = self._nodes_get
+            resolve = self._get_node_by_alias
+            params = ua.ReadParameters()
+            for alias in missing:
+                rv = ua.ReadValueId()
+                rv.NodeId = (cached(alias) or resolve(alias)).nodeid
+                rv.AttributeId = ua.AttributeIds.DataType
+                params.NodesToRead.append(rv)
+            for alias, dv in zip(missing, self.client.uaclient.read(params)): # type: ignore
+                vtypes[alias] = _variant_type_of(dv)
+        return [vtypes[alias] for alias in aliases]
+
+    def _register_all(self) -> None:
+        '''
+        Metodo privado que resuelve todos los alias cargados y los registra
+        en el servidor (RegisterNodes) en una sola peticion. El servidor
+        devuelve NodeIds optimizados para accesos repetidos.
+
+        Si el servidor no soporta el registro se mantiene la resolucion
+        lazy de `_get_node_by_alias`.
+        '''
+        if not self.is_connected or not self._aliases:
+            return
+        try:
+            raw_nodes = [self.client.get_node(nodeid) for nodeid in self._nodeids.values()] # type: ignore
+            registered = self.client.register_nodes(raw_nodes) # type: ignore
+        except Exception as exc:
+            logger.warning("No se han podido registrar los nodos: %s", exc)
+            return
+        self._nodes.update(zip(self._aliases, registered))
+        self._read_params.clear()  # Los NodeIds registrados sustituyen a los originales
+        self._registered = True
+        logger.info("Registrados %d nodos en %s", len(registered), self.endpoint_url)
+
+    def _unregister_all(self) -> None:
+        '''
+        Metodo privado que libera en el servidor los nodos registrados
+        por `_register_all`. Tolerante a fallos: solo deja traza.
+        '''
+        if not self._registered:
+            return
+        self._registered = False
+        self._read_params.clear()
+        try:
+            self.client.unregister_nodes(list(self._nodes.values())) # type: ignore
+        except Exception as exc:
+            logger.warning("Error al liberar nodos registrados: %s", exc)
+
     def _get_node_by_alias(self,alias:str) -> Any: 
         '''
         Metodo privado que devuelve un nodo resuelto dado a traves
@@ -363,28 +826,30 @@ class OpcClient:
             Si el cliente no esta conectado, el alias es desconocido
             o un error de acceso al nodo.
         '''                
-        if not self.is_connected:
-            raise OpcClientError("Cliente no conectado")
-        if alias not in self.aliases:
+        # Consulta a memoria interna (nodos registrados o ya resueltos):
+        # un solo acceso al dict en el caso habitual
+        node = self._nodes_get(alias)
+        if node is not None:
+            return node
+
+        if alias not in self._alias_set:
             raise OpcClientError(f"Alias desconocido: {alias}")
-        
-        # Consulta a memoria interna
-        node = self._nodes.get(alias)
 
         # Si no se ha encontrado nada: se resuelve y se guarda
-        if node is None:
-            nodeid = self._aliases[alias]
-            try:
-                node = self.client.get_node(nodeid) # type: ignore
-                self._nodes[alias] = node
-            except Exception as exc:
-                raise OpcClientError(f"Error al acceder al nodo {alias}:{nodeid}") from exc
+        nodeid = self._nodeids_get(alias)
+        try:
+            node = self.client.get_node(nodeid) # type: ignore
+            self._nodes[alias] = node
+        except OpcClientError:
+            raise
+        except Exception as exc:
+            raise OpcClientError(f"Error al acceder al nodo {alias}:{nodeid.to_string()}") from exc
         return node
 
     @property
     def is_connected(self) -> bool:
         '''Indica si hay una conexion OPC UA activa'''
-        return self.client is not None
+        return self.client is not _DISCONNECTED
 
     @property
     def aliases(self) -> dict[str,str]:
@@ -437,9 +902,9 @@ if __name__ == "__main__":
 '''
     print("\nLeo")
     
-    # Leer nodos
-    for alias in nodes.keys():
-        print(f"Señal: {alias}\t\tValor: {cli.read_node(alias)}")
+    # Leer nodos (una sola peticion Read)
+    for alias, value in cli.read_nodes(list(nodes)).items():
+        print(f"Señal: {alias}\t\tValor: {value}")
 '''
 
 '''
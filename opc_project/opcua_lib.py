@@ -1,6 +1,13 @@
-import logging,sys
-from typing import Any
+import logging,sys,random,json
+from functools import lru_cache
+from typing import Any, Final
 from opcua import ua
+try:
+    import orjson
+except ImportError:  # Dependencia opcional: se usa json de la libreria estandar
+    orjson = None
+
+logger = logging.getLogger(__name__)
 
 class OpcServerError(RuntimeError):
     """
@@ -15,6 +22,204 @@ class OpcServerError(RuntimeError):
         self.endpoint = endpoint
         self.original = original
 
+def json_loads(raw: bytes) -> Any:
+    """
+    Parsea JSON desde bytes con `orjson` si esta instalado.
+
+    Raises
+    ------
+    json.JSONDecodeError
+        Si el contenido no es JSON valido (`orjson.JSONDecodeError` hereda de ella).
+    """
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+def json_dumps(obj: Any, pretty: bool = False) -> bytes:
+    """
+    Serializa `obj` a JSON en UTF-8 con `orjson` si esta instalado.
+
+    Parameters
+    ----------
+    obj : Any
+        Objeto a serializar.
+    pretty : bool, default=False
+        Indentacion de 2 espacios para lectura humana. Por defecto
+        el JSON es compacto (archivos consumidos por programas).
+    """
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+# Errores de sesion que no se arreglan reintentando (credenciales o permisos)
+FATAL_STATUS_CODES = frozenset({
+    ua.StatusCodes.BadIdentityTokenInvalid,
+    ua.StatusCodes.BadIdentityTokenRejected,
+    ua.StatusCodes.BadUserAccessDenied,
+})
+
+def backoff_delay(attempt: int, backoff_s: float, max_delay_s: float = 30.0, jitter: float = 0.5) -> float:
+    """
+    Calcula la espera antes del siguiente reintento.
+
+    Backoff exponencial (`backoff_s * 2**(attempt-1)`) limitado a `max_delay_s`
+    y con un factor aleatorio de hasta `jitter`, para que varios clientes
+    que pierden la conexion a la vez no reintenten sincronizados.
+
+    Parameters
+    ----------
+    attempt : int
+        Numero de intento fallido (empezando en 1).
+    backoff_s : float
+        Espera base en segundos.
+    max_delay_s : float, default=30.0
+        Espera maxima antes de aplicar el jitter.
+    jitter : float, default=0.5
+        Fraccion aleatoria maxima que se añade a la espera.
+
+    Returns
+    -------
+    float
+        Segundos a esperar.
+    """
+    delay = min(max_delay_s, backoff_s * (2 ** (attempt - 1)))
+    return delay * (1 + random.random() * jitter)
+
+def is_fatal_ua_error(exc: BaseException) -> bool:
+    """Indica si `exc` es un error UA que no tiene sentido reintentar"""
+    return getattr(exc, "code", None) in FATAL_STATUS_CODES
+
+# Tablas de validacion: se construyen una sola vez al importar el modulo
+TYPE_MAP: Final[dict[str, ua.VariantType]] = {
+    "boolean":ua.VariantType.Boolean,
+    "sbyte":ua.VariantType.SByte,
+    "byte":ua.VariantType.Byte,
+    "int16":ua.VariantType.Int16,
+    "uint16":ua.VariantType.UInt16,
+    "int32":ua.VariantType.Int32,
+    "uint32":ua.VariantType.UInt32,
+    "int64":ua.VariantType.Int64,
+    "uint64":ua.VariantType.UInt64,
+    "float":ua.VariantType.Float,
+    "double":ua.VariantType.Double,
+    "string":ua.VariantType.String
+}
+
+_TRUE: Final = frozenset({"1", "true", "t", "yes", "y", "si", "sí", "on"})
+_FALSE: Final = frozenset({"0", "false", "f", "no", "n", "", "off"})
+
+# Variantes de mayusculas habituales en el CSV ("Int16", "INT16", "true", "TRUE"...):
+# se resuelven con un solo acceso al dict, sin crear la cadena de .lower()
+_TYPE_LOOKUP: Final[dict[str, ua.VariantType]] = {
+    variant: vtype
+    for key, vtype in TYPE_MAP.items()
+    for variant in (key, key.upper(), vtype.name)
+}
+_BOOL_LOOKUP: Final[dict[str, bool]] = {
+    variant: value
+    for words, value in ((_TRUE, True), (_FALSE, False))
+    for word in words
+    for variant in (word, word.upper(), word.title())
+}
+
+def _parse_bool(raw: str) -> bool | None:
+    """Devuelve el booleano de `raw` o `None` si no es un literal booleano"""
+    value = _BOOL_LOOKUP.get(raw)
+    if value is None:  # Mayusculas mezcladas: se normaliza
+        value = _BOOL_LOOKUP.get(raw.lower())
+    return value
+
+_INT_VTYPES: Final = frozenset({
+    ua.VariantType.SByte, ua.VariantType.Byte,
+    ua.VariantType.Int16, ua.VariantType.UInt16,
+    ua.VariantType.Int32, ua.VariantType.UInt32,
+    ua.VariantType.Int64, ua.VariantType.UInt64,
+})
+
+# Conversores de 'initial' (ya sin espacios) por tipo; lanzan ValueError si no encaja
+def _cast_bool(raw: str) -> bool:
+    value = _parse_bool(raw)
+    if value is None:
+        raise ValueError(f"Valor inicial no es booleano: {raw!r}")
+    return value
+
+def _cast_str(raw: str) -> str:
+    return raw
+
+def _cast_int(raw: str) -> int:
+    # Permite vacío -> 0
+    if raw == "":
+        return 0
+    try:
+        return int(raw)
+    except ValueError:
+        raise ValueError(f"Valor inicial no es int: {raw!r}") from None
+
+def _cast_float(raw: str) -> float:
+    # Punto decimal (caso habitual): un solo float() sin copiar la cadena
+    try:
+        return float(raw)
+    except ValueError:
+        pass
+    # Permite vacío -> 0.0 y coma decimal
+    norm = raw.replace(",", ".")
+    try:
+        return float(norm) if norm != "" else 0.0
+    except ValueError:
+        raise ValueError(f"Valor inicial no es float: {raw!r}") from None
+
+# Despacho por tipo con un solo acceso a dict en lugar de la cadena de if/elif
+_CASTERS: Final[dict[ua.VariantType, Any]] = {
+    ua.VariantType.Boolean: _cast_bool,
+    ua.VariantType.String: _cast_str,
+    **dict.fromkeys(_INT_VTYPES, _cast_int),
+    ua.VariantType.Float: _cast_float,
+    ua.VariantType.Double: _cast_float,
+}
+
+# Rango de cada entero OPC UA: un valor fuera de rango no cabe en el tipo del nodo
+_INT_RANGES: Final[dict[ua.VariantType, tuple[int, int]]] = {
+    ua.VariantType.SByte: (-2**7, 2**7 - 1),
+    ua.VariantType.Byte: (0, 2**8 - 1),
+    ua.VariantType.Int16: (-2**15, 2**15 - 1),
+    ua.VariantType.UInt16: (0, 2**16 - 1),
+    ua.VariantType.Int32: (-2**31, 2**31 - 1),
+    ua.VariantType.UInt32: (0, 2**32 - 1),
+    ua.VariantType.Int64: (-2**63, 2**63 - 1),
+    ua.VariantType.UInt64: (0, 2**64 - 1),
+}
+
+def cast_value(value: Any, vtype: ua.VariantType) -> Any:
+    """
+    Ajusta un valor a escribir al VariantType de su nodo.
+    - Las cadenas pasan por los mismos conversores que 'initial' del CSV
+    - bool solo en Boolean; int (en rango) en enteros; int/float en Float/Double
+    - Lanza ValueError si el valor no encaja en el tipo
+    """
+    if isinstance(value, str) and vtype is not ua.VariantType.String:
+        caster = _CASTERS.get(vtype)
+        if caster is not None:
+            value = caster(value.strip())
+
+    if vtype is ua.VariantType.Boolean:
+        if isinstance(value, bool):
+            return value
+    elif vtype in _INT_RANGES:
+        if isinstance(value, int) and not isinstance(value, bool):
+            low, high = _INT_RANGES[vtype]
+            if low <= value <= high:
+                return value
+            raise ValueError(f"Valor fuera de rango para {vtype.name}: {value!r}")
+    elif vtype is ua.VariantType.Float or vtype is ua.VariantType.Double:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+    elif vtype is ua.VariantType.String:
+        if isinstance(value, str):
+            return value
+    else:
+        return value  # Tipo sin conversor: lo valida python-opcua
+    raise ValueError(f"Valor no compatible con {vtype.name}: {value!r}")
+
 def validate_types(node_line: dict[str,Any])->dict:  
     """
     Valida que 'datatype' sea soportado y que 'initial' concuerde con el tipo.
@@ -23,121 +228,111 @@ def validate_types(node_line: dict[str,Any])->dict:
     - Devuelve el mismo dict mutado
     """
 
-    TYPE_MAP = {"boolean":ua.VariantType.Boolean,
-                "sbyte":ua.VariantType.SByte,
-                "byte":ua.VariantType.Byte,
-                "int16":ua.VariantType.Int16,
-                "uint16":ua.VariantType.UInt16,
-                "int32":ua.VariantType.Int32,
-                "uint32":ua.VariantType.UInt32,
-                "int64":ua.VariantType.Int64,
-                "uint64":ua.VariantType.UInt64,
-                "float":ua.VariantType.Float,
-                "double":ua.VariantType.Double,
-                "string":ua.VariantType.String
-    }              
-
-    _TRUE = {"1", "true", "t", "yes", "y", "si", "sí"}
-    _FALSE = {"0", "false", "f", "no", "n", ""}
-
     # Ver que el tipo de datos este contemplado
-    dtype_key = str(node_line["datatype"]).strip().lower()
-    if dtype_key not in TYPE_MAP:
+    dtype_key = str(node_line["datatype"]).strip()
+    vtype = _TYPE_LOOKUP.get(dtype_key)
+    if vtype is None:
+        vtype = TYPE_MAP.get(dtype_key.lower())
+    if vtype is None:
         raise ValueError(f"Datatype no soportado: {node_line['datatype']!r}")
 
     # Casteo según vtype
-    vtype = TYPE_MAP[dtype_key]
     raw = str(node_line.get("initial", "")).strip()
 
-    # bool
-    if vtype == ua.VariantType.Boolean:
-        low = raw.lower()
-        if low in _TRUE:
-            initial = True
-        elif low in _FALSE:
-            initial = False
-        else:
-            raise ValueError(f"Valor inicial no es booleano: {raw!r}")
-
-    # string
-    elif vtype == ua.VariantType.String:
-        initial = raw 
-
-    # int
-    elif vtype in {
-            ua.VariantType.SByte, ua.VariantType.Byte,
-            ua.VariantType.Int16, ua.VariantType.UInt16,
-            ua.VariantType.Int32, ua.VariantType.UInt32,
-            ua.VariantType.Int64, ua.VariantType.UInt64,
-        }:
-        # Permite vacío -> 0
-        if raw == "":
-            initial = 0
-        else:
-            try:
-                initial = int(raw)
-            except Exception:
-                raise ValueError(f"Valor inicial no es int: {raw!r}")
-
-    # float
-    elif vtype == ua.VariantType.Float or ua.VariantType.Double:
-        # Permite vacío -> 0.0 y coma decimal
-        norm = raw.replace(",", ".")
-        try:
-            initial = float(norm) if norm != "" else 0.0
-        except Exception:
-            raise ValueError(f"Valor inicial no es float: {raw!r}")
-
-    else:
+    caster = _CASTERS.get(vtype)
+    if caster is None:
         # No deberías llegar aquí con el TYPE_MAP actual
         raise ValueError(f"Datatype no manejado: {vtype}")
+    initial = caster(raw)
 
     # Mutar el dict de entrada con valores ya validados/casteados
     node_line["datatype"]= vtype
     node_line["initial"]= initial
 
     # Castear writable
-    writable=str(node_line["writable"]).strip().lower()
-    if writable in _TRUE:
-        node_line["writable"] = True
-    elif writable in _FALSE:
-        node_line["writable"] = False
-    else:
+    writable=str(node_line["writable"]).strip()
+    node_line["writable"] = _parse_bool(writable)
+    if node_line["writable"] is None:
         raise ValueError(f"Valor de 'Writable' no es booleano: {writable!r}")
 
     return node_line
 
-def build_node_dict(root_node, dic, idx_filter=None):
-    # Recorre recursivamente todos los nodos hijos a partir de root_node
+def build_node_dict(root_node, dic=None, idx_filter=None) -> dict[str, str]:
+    # Recorre por niveles (BFS) todos los nodos hijos a partir de root_node
     # root_node: nodo inicial (por ejemplo, server.get_objects_node())
-    # dic: diccionario donde se guardan los pares {BrowseName: NodeId}
+    # dic: diccionario donde se guardan los pares {BrowseName: NodeId};
+    #      si no se indica se crea uno nuevo. Se devuelve en ambos casos
     # idx_filter: si se indica, solo añade nodos de ese namespace index
+    if dic is None:
+        dic = {}
+
+    # Sesion del nodo: InternalSession en el servidor, UaClient en el cliente.
+    # Ambos exponen browse(BrowseParameters)
+    session = root_node.server
+
+    # Nodos descartados por StatusCode no valido (se informa una sola vez al final)
+    skipped = 0
+    first_bad = None
 
-    # Obtener hijos directos del nodo actual
-    children = root_node.get_children()
+    # Sin recursion: no hay limite de profundidad ni un frame por nodo
+    level = [root_node.nodeid]
+    while level:
+        # Un solo Browse por nivel: cada ReferenceDescription ya trae
+        # NodeId, BrowseName y NodeClass del hijo, sin lecturas de atributos
+        params = ua.BrowseParameters()
+        params.RequestedMaxReferencesPerNode = 0
+        for nodeid in level:
+            desc = ua.BrowseDescription()
+            desc.NodeId = nodeid
+            desc.BrowseDirection = ua.BrowseDirection.Forward
+            desc.ReferenceTypeId = ua.NodeId(ua.ObjectIds.HierarchicalReferences)
+            desc.IncludeSubtypes = True
+            desc.NodeClassMask = ua.NodeClass.Unspecified
+            desc.ResultMask = ua.BrowseResultMask.All
+            params.NodesToBrowse.append(desc)
 
-    for child in children:
-        try:
-            # Obtener el nombre legible del nodo
-            browse_name = child.get_browse_name().Name
-            # Convertir NodeId a string (ejemplo: "ns=2;i=3")
-            nodeid_str = child.nodeid.to_string()
+        next_level = []
+        for nodeid, result in zip(level, session.browse(params)):
+            # Cada resultado trae su StatusCode: los nodos que no se pueden
+            # explorar se ignoran sin lanzar ni capturar excepciones
+            if not result.StatusCode.is_good():
+                skipped += 1
+                if first_bad is None:
+                    first_bad = (nodeid, result.StatusCode)
+                continue
+            refs = result.References
+            while result.ContinuationPoint:
+                # Solo si el servidor limita las referencias por nodo
+                cont = ua.BrowseNextParameters()
+                cont.ContinuationPoints = [result.ContinuationPoint]
+                result = session.browse_next(cont)[0]
+                refs.extend(result.References)
 
-            # Comprobar si es Variable y si coincide con el filtro de namespace
-            if child.get_node_class() == ua.NodeClass.Variable:
-                if idx_filter is None or child.nodeid.NamespaceIndex == idx_filter:
-                    dic[browse_name] = nodeid_str
-        except Exception:
-            # Algunos nodos pueden no devolver browse_name o clase -> ignorar
-            pass
+            for ref in refs:
+                child = ref.NodeId
+                next_level.append(child)
+                # El filtro de namespace y la clase son locales; solo las
+                # variables llegan a formatear su NodeId
+                if ref.NodeClass == ua.NodeClass.Variable:
+                    if idx_filter is None or child.NamespaceIndex == idx_filter:
+                        dic[ref.BrowseName.Name] = child.to_string()
 
-        # Llamada recursiva para explorar los subnodos
-        build_node_dict(child, dic, idx_filter)
+        # Los subnodos se exploran en el siguiente nivel
+        level = next_level
 
+    if skipped:
+        logger.debug("build_node_dict: %d nodos omitidos por StatusCode no valido (primero: %s, %s)",
+                     skipped, first_bad[0], first_bad[1].name)
+    return dic
+
+@lru_cache(maxsize=1)
 def setup_logging(level: str | None, file_path: str | None = None) -> None:
     """
     Configura el sistema de logging de la aplicación.
 
+    Repetir la llamada con la misma configuración no hace nada; una
+    configuración distinta sustituye a los handlers anteriores (`force=True`).
+
     Crea un logger básico con salida a consola (`stdout`) y,
     opcionalmente, a un archivo si se especifica `file_path`.
     Permite establecer el nivel de logging a través de texto
@@ -167,4 +362,5 @@ def setup_logging(level: str | None, file_path: str | None = None) -> None:
             level=getattr(logging, level.upper(), logging.INFO),
             format="%(asctime)s %(levelname)s %(name)s: %(message)s",
             handlers=handlers,
+            force=True,
     )
\ No newline at end of file
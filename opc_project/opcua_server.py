@@ -1,20 +1,24 @@
 from opcua import Server, ua, Node
-from typing import Any
-from .opcua_lib import validate_types,build_node_dict,OpcServerError
-import time,json,logging
+from typing import Any, Final, Self
+from types import TracebackType
+from .opcua_lib import validate_types,cast_value,OpcServerError,backoff_delay,json_dumps
+import os,time,logging,asyncio,weakref,io
+from concurrent.futures import Future, ThreadPoolExecutor
 import csv
 from pathlib import Path
 from opcua.ua.uaerrors import UaError
 
 '''
 Funcionalidades por implementar:
-- Context Manager
 - Rango de valores en validate_types
 '''
 
 logger = logging.getLogger(__name__)
 __version__ = "0.1.0"
 
+# Miembros de VariantType: pertenencia por hash en las invariantes, sin recorrer el enum
+_VT_SET: Final[frozenset[ua.VariantType]] = frozenset(ua.VariantType)
+
 class OpcServer:
 
     '''
@@ -25,6 +29,9 @@ class OpcServer:
 
     '''
 
+    # Tamaño del buffer de lectura del CSV de nodos
+    _CSV_BUFFER = 1 << 20
+
     def __init__(self,endpoint_url : str,namespace : str,
                  files_dir : str, nodes_input_file: str, nodes_output_file: str) -> None:
         '''
@@ -37,11 +44,14 @@ class OpcServer:
         namespace: str
             Espacio de nombres.
         files_dir: str
-            Directorio de los archivos de configuracion.
+            Directorio de los archivos de configuracion. El separador final
+            es opcional: las rutas se construyen con ``Path(files_dir) / archivo``.
         nodes_input: str
             Archivo CSV donde se guarda informacion para la creacion de los nodos.
+            Relativo a `files_dir`; si es una ruta absoluta, `files_dir` se ignora.
         nodes_output: str
             Archivo JSON con la información para la instanciación de los nodos por parte de los clientes.
+            Relativo a `files_dir`; si es una ruta absoluta, `files_dir` se ignora.
 
         Attributes
         ----------
@@ -63,11 +73,29 @@ class OpcServer:
         self._files_dir : str = files_dir
         self._nodes_input : str = nodes_input_file
         self._nodes_output : str = nodes_output_file
+        # Rutas unidas una sola vez (files_dir puede venir con o sin separador final)
+        self._input_path : Path = Path(files_dir) / nodes_input_file
+        self._output_path : Path = Path(files_dir) / nodes_output_file
+        # Ultimo CSV parseado: (clave mtime/tamaño/opciones, filas, total, omitidas)
+        self._csv_cache : tuple[tuple, list, int, int] | None = None
+        # Hilo de E/S para escribir el JSON exportado sin bloquear al llamante;
+        # un solo worker: las exportaciones se escriben en orden. Se crea en la
+        # primera exportacion y se cierra en stop(clean=True)
+        self._io_exec : ThreadPoolExecutor | None = None
+        self._last_export : Future | None = None
         self._server: Server | None = None
         self._nodes : dict[str,Any] | None = None
         self._resolved_nodes : list | None = None
+        # Indice nodeid -> nodo resuelto: comprobacion O(1) en lectura/escritura
+        self._resolved_by_nodeid : dict[str, Node] = {}
+        # BrowseName -> NodeId (str) de cada nodo resuelto: contenido del JSON exportado
+        self._export_dict : dict[str, str] = {}
+        # VariantType de cada nodeid resuelto (del CSV) para escribir sin inferencia
+        self._vtypes : dict[str, ua.VariantType] = {}
         self._idx : int | None = None
         self._started: bool | None = None
+        # Para el servidor si la instancia se recoge sin llamar a stop(clean=True)
+        self._finalizer: weakref.finalize | None = None
         self._check_general_invariants
         
     def create(self) -> None:
@@ -78,7 +106,7 @@ class OpcServer:
 
         # Idempotencia
         if self.is_created:
-            logger.info(f"Servidor ya creado en {self._endpoint_url}")
+            logger.info("Servidor ya creado en %s", self._endpoint_url)
 
             # Comprobar si tambien tien el espacio de nombre registrado
             if not self.idx_is_registered:
@@ -91,6 +119,8 @@ class OpcServer:
 
             self._server = server
             self._register_index()  
+            # Sin referencia a self: el finalizador no impide la recoleccion
+            self._finalizer = weakref.finalize(self, OpcServer._safe_stop, server, self._endpoint_url)
         except Exception as exc:
             # Limpieza del estado interno solo si algo se rompió antes de quedar listo
             self._server = None
@@ -98,10 +128,11 @@ class OpcServer:
             logger.exception("Fallo creando el servidor en %s", self._endpoint_url)
             raise OpcServerError(self._endpoint_url, "Fallo en la creación del servidor") from exc
 
-        logger.info(f"Servidor creado en {self._endpoint_url}")
+        logger.info("Servidor creado en %s", self._endpoint_url)
         self._check_general_invariants
 
-    def start(self, retries: int = 3, backoff_s:float = 1.0) -> bool:
+    def start(self, retries: int = 3, backoff_s:float = 1.0,
+              max_delay_s: float = 30.0, jitter: float = 0.5) -> bool:
         '''
         Arranca el servidor.
 
@@ -110,7 +141,11 @@ class OpcServer:
         retries
             Numero de reintentos en caso de error de inicio
         backoff_s
-            Tiempo de espera entre reintentos
+            Tiempo de espera base entre reintentos; se duplica en cada fallo
+        max_delay_s
+            Tiempo de espera maximo entre reintentos
+        jitter
+            Fraccion aleatoria añadida a cada espera
         
         Returns
         -------
@@ -140,7 +175,7 @@ class OpcServer:
 
         # Idempotencia
         if self.is_started:
-            logger.info(f"Servidor ya arrancado en {self._endpoint_url}")
+            logger.info("Servidor ya arrancado en %s", self._endpoint_url)
             return True
 
         # Arrancar servidor
@@ -153,7 +188,7 @@ class OpcServer:
                 self._server.start()
                 self._started=True
 
-                logger.info(f"Arranque servidor en {self._endpoint_url} exitoso")
+                logger.info("Arranque servidor en %s exitoso", self._endpoint_url)
                 self._check_general_invariants()
                 return True
             
@@ -161,7 +196,7 @@ class OpcServer:
                 last_exc = exc
                 if attempt < retries:
                     logger.warning("Intento %d/%d falló: %s", attempt, retries, exc)
-                    time.sleep(backoff_s * attempt)
+                    time.sleep(backoff_delay(attempt, backoff_s, max_delay_s, jitter))
                 else:
                     logger.error("Error al arrancar a %s tras %d intentos", self._endpoint_url, retries)
                     
@@ -197,13 +232,71 @@ class OpcServer:
             self._started = False
 
             if clean:
+                # No perder una exportacion pendiente
+                self._wait_export()
+                if self._io_exec is not None:
+                    self._io_exec.shutdown(wait=True)
+                    self._io_exec = None
                 self._server: Server | None = None
                 self._idx : int | None = None
                 self._nodes : dict[str,Any] | None = None
+                self._csv_cache = None
+                # Los nodos resueltos pertenecian al servidor descartado
+                self._resolved_nodes = None
+                self._resolved_by_nodeid = {}
+                self._export_dict = {}
+                self._vtypes = {}
+                if self._finalizer is not None:
+                    self._finalizer.detach()
+                    self._finalizer = None
 
         self._check_general_invariants()
         return True
 
+    @staticmethod
+    def _safe_stop(server: Server, endpoint_url: str) -> None:
+        '''
+        Metodo privado que para un servidor abandonado (recolectado o al salir
+        del interprete) sin llamar a stop(). Nunca lanza excepciones.
+        '''
+        try:
+            server.stop()
+            logger.info("Servidor en %s detenido por el finalizador", endpoint_url)
+        except Exception:
+            pass
+
+    def __enter__(self) -> Self:
+        '''
+        Arranca el servidor al entrar en un bloque `with`.
+
+        Returns
+        -------
+        self : OpcServer
+        '''
+        self.start()
+        return self
+
+    def __exit__(self, exc_type:type[BaseException] | None, exc:BaseException | None, tb:TracebackType | None) -> None:
+        '''
+        Para el servidor con limpieza al salir del bloque `with`,
+        tambien si se sale por una excepción.
+        '''
+        self.stop(clean=True)
+
+    async def __aenter__(self) -> Self:
+        '''
+        Version asincrona de `__enter__`: el arranque se ejecuta en un hilo
+        para no bloquear el bucle de eventos.
+        '''
+        await asyncio.to_thread(self.start)
+        return self
+
+    async def __aexit__(self, exc_type:type[BaseException] | None, exc:BaseException | None, tb:TracebackType | None) -> None:
+        '''
+        Version asincrona de `__exit__`.
+        '''
+        await asyncio.to_thread(self.stop, True)
+
     def load_nodes_from_csv(self,
                             *,
                             delimiter: str = ',',
@@ -242,96 +335,152 @@ class OpcServer:
         """
 
         # Ruta de importacion
-        path_csv= Path(self._files_dir + self._nodes_input)
+        path_csv= self._input_path
+
+        # Clave de la cache: si el archivo y las opciones no cambian no se vuelve a parsear
+        try:
+            st = path_csv.stat()
+        except FileNotFoundError as exc:
+            raise OpcServerError(self._endpoint_url,f"El archivo no existe: {path_csv}",original=exc) from exc
+        except Exception as exc:
+            raise OpcServerError(self._endpoint_url,f"Error inesperado en la carga fichero CSV: {path_csv}",original=exc) from exc
+        key = (st.st_mtime_ns, st.st_size, delimiter, encoding, required_fields)
+
+        if self._csv_cache is not None and self._csv_cache[0] == key:
+            _, rows, total_rows, skipped = self._csv_cache
+            logger.info("Archivo CSV sin cambios desde la ultima carga: %s", path_csv)
+        else:
+            rows, total_rows, skipped = self._parse_csv_rows(path_csv, delimiter, encoding, required_fields)
+            self._csv_cache = (key, rows, total_rows, skipped)
+
+        # Estructuras de estado
+        stats = {"total_rows": total_rows, "loaded": 0, "skipped": skipped, "duplicates": 0, "errors": 0}
+        # Solo se construye el delta: el catalogo existente no se copia
+        existing: dict[str, dict] = self._nodes or {}
+        nodes: dict[str, dict] = {}
+
+        for line, alias, node_def in rows:
+            # Duplicados por nombre (ajusta la clave si usas otra)
+            if alias in existing or alias in nodes:
+                logger.warning("Fila %d: nombre duplicado '%s'. Se omite.", line, alias)
+                stats["duplicates"] += 1
+                continue
+
+            # Fila con datos invalidos (ya registrada al parsear)
+            if node_def is None:
+                stats["errors"] += 1
+                continue
 
+            # Guardar en estructura local
+            nodes[alias] = node_def
+            stats["loaded"] += 1
+
+        logger.info(
+            "CSV cargado: %s | total=%d, loaded=%d, skipped=%d, duplicates=%d, errors=%d",
+            path_csv, stats["total_rows"], stats["loaded"], stats["skipped"], stats["duplicates"], stats["errors"]
+        )
+
+        # Commit de los nodos cargados en el estado del servidor
+        prev_nodes = self._nodes
+        self._nodes = {**existing, **nodes}
+
+        # Comprobar invariantes
+        try:
+            self._check_nodes_invariants()  
+        except AssertionError as exc:
+            # Revierte estado si no cumple
+            self._nodes = prev_nodes
+            raise OpcServerError(self._endpoint_url, "Invariantes de nodos incumplidas", original=exc) from exc
+        
+        return stats
+    
+    def _parse_csv_rows(self, path_csv: Path, delimiter: str, encoding: str,
+                        required_fields: tuple[str,...]) -> tuple[list[tuple[int, str, dict | None]], int, int]:
+        '''
+        Metodo privado que parsea y valida el CSV de nodos sin tocar el catalogo.
+
+        Returns
+        -------
+        tuple
+            ``(rows, total_rows, skipped)``: ``rows`` son ``(linea, alias, node_def)``
+            en orden de archivo, con ``node_def=None`` si la fila tiene datos invalidos.
+            Los duplicados se deciden despues, frente al catalogo vigente.
+        '''
         # Carga de archivo
         try: 
-            f = path_csv.open("r", newline="", encoding=encoding)
-            logger.info(f"Archivo CSV cargado correctamente: {path_csv}")
+            # Buffer de 1 MiB: menos llamadas read() al sistema en CSV grandes
+            raw = path_csv.open("rb", buffering=self._CSV_BUFFER)
+            try:
+                f = io.TextIOWrapper(raw, encoding=encoding, newline="")
+            except Exception:
+                raw.close()  # p. ej. encoding desconocido
+                raise
+            logger.info("Archivo CSV cargado correctamente: %s", path_csv)
         except FileNotFoundError as exc:
             raise OpcServerError(self._endpoint_url,f"El archivo no existe: {path_csv}",original=exc) from exc
         except Exception as exc:
             raise OpcServerError(self._endpoint_url,f"Error inesperado en la carga fichero CSV: {path_csv}",original=exc) from exc
 
         with f:
-            reader = csv.DictReader(f,delimiter=delimiter)
-            header = reader.fieldnames
+            # Lector posicional: sin dict por fila hasta que la fila es valida
+            reader = csv.reader(f,delimiter=delimiter)
+            header = next(reader, None)
 
             # Validación de cabecera
             if not header:
                 raise OpcServerError(self._endpoint_url, f"CSV sin cabecera: {path_csv}")
 
-            faltan = [c for c in required_fields if c not in header]
+            # Comparacion exacta (sensible a mayusculas) contra un conjunto: O(R+H)
+            header_set = frozenset(header)
+            faltan = [c for c in required_fields if c not in header_set]
             if faltan:
                 raise OpcServerError(
                     self._endpoint_url,
                     f"Faltan columnas obligatorias {faltan} en {path_csv}. Cabecera: {header}",
                 )
 
-            # Estructuras de estado
-            stats = {"total_rows": 0, "loaded": 0, "skipped": 0, "duplicates": 0, "errors": 0}
-            nodes: dict[str, dict] = {} if self._nodes is None else dict(self._nodes)  # copia defensiva
+            # Posiciones de columna calculadas una vez
+            n_cols = len(header)
+            required_idx = tuple(header.index(c) for c in required_fields)
+            alias_idx = header.index("alias")
+
+            rows: list[tuple[int, str, dict | None]] = []
+            total_rows = skipped = 0
 
             # Procesando fila a fila
+            # reader.line_num (línea real del archivo) solo se consulta al registrar avisos
             for row in reader:
-                stats["total_rows"] +=1
-                line = reader.line_num  # línea real del archivo (útil para logs)
-
-                # Normalización básica: strip en strings
-                norm_row = {k: (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
-
-                # Comprobar requeridos no vacíos
-                if any(not norm_row.get(c) for c in required_fields):
-                    logger.warning("Fila %d: campos requeridos vacíos (%s). Se omite.", line, required_fields)
-                    stats["skipped"] += 1
+                # Igual que csv.DictReader: las lineas vacias no cuentan como filas
+                if not row:
                     continue
+                total_rows += 1
 
-                alias = norm_row["alias"]
+                # Normalización básica: strip; columnas que faltan -> vacías
+                values = [v.strip() for v in row]
+                if len(values) < n_cols:
+                    values.extend([""] * (n_cols - len(values)))
 
-                # Duplicados por nombre (ajusta la clave si usas otra)
-                if alias in nodes:
-                    logger.warning("Fila %d: nombre duplicado '%s'. Se omite.", line, alias)
-                    stats["duplicates"] += 1
+                # Comprobar requeridos no vacíos
+                if any(not values[i] for i in required_idx):
+                    logger.warning("Fila %d: campos requeridos vacíos (%s). Se omite.", reader.line_num, required_fields)
+                    skipped += 1
                     continue
 
                 # Construcción del dict del nodo
                 try:
-                    node_def = validate_types(norm_row)
-                    
+                    node_def = validate_types(dict(zip(header, values)))
                 except ValueError as exc:
                     # Errores de contenido/parseo
-                    logger.warning("Fila %d: datos inválidos (%s). Se omite.", line, exc) 
-                    stats["errors"] += 1
-                    continue
+                    logger.warning("Fila %d: datos inválidos (%s). Se omite.", reader.line_num, exc) 
+                    node_def = None
                 except Exception as exc:
-                    logger.warning("Fila %d: error inesperado al procesar fila: %s", line, exc, exc_info=True)
-                    stats["errors"] += 1
-                    continue
+                    logger.warning("Fila %d: error inesperado al procesar fila: %s", reader.line_num, exc, exc_info=True)
+                    node_def = None
 
-                # Guardar en estructura local
-                nodes[alias] = node_def
-                stats["loaded"] += 1
+                rows.append((reader.line_num, values[alias_idx], node_def))
 
+        return rows, total_rows, skipped
 
-            logger.info(
-                "CSV cargado: %s | total=%d, loaded=%d, skipped=%d, duplicates=%d, errors=%d",
-                path_csv, stats["total_rows"], stats["loaded"], stats["skipped"], stats["duplicates"], stats["errors"]
-            )
-
-        # Commit de los nodos cargados en el estado del servidor
-        prev_nodes = self._nodes
-        self._nodes = nodes
-
-        # Comprobar invariantes
-        try:
-            self._check_nodes_invariants()  
-        except AssertionError as exc:
-            # Revierte estado si no cumple
-            self._nodes = prev_nodes
-            raise OpcServerError(self._endpoint_url, "Invariantes de nodos incumplidas", original=exc) from exc
-        
-        return stats
-    
     def resolve_nodes(self):
         '''
         Añade nodos a partir de los alias cargados
@@ -366,52 +515,72 @@ class OpcServer:
         # Y se crea una carpeta raiz limpia
         nodes = root.add_folder(idx, 'root')
         self._resolved_nodes = []
+        self._resolved_by_nodeid = {}
+        self._export_dict = {}
+        self._vtypes = {}
+        writable_nodes = []
+        # Carpetas ya creadas bajo la raiz: una por nombre, sin browse por fila
+        folders: dict[str, Node] = {}
 
         # Estructuras de estado
         stats = {"total_rows": 0, "resolved": 0, "duplicates": 0, "errors": 0}
         
         # Recorrer alias
         assert self._nodes is not None
+        # Atributos y constantes del bucle ligados a locales una sola vez
+        resolved_append = self._resolved_nodes.append
+        resolved_by_nodeid = self._resolved_by_nodeid
+        export_dict = self._export_dict
+        vtypes = self._vtypes
+        bad_exists = ua.StatusCodes.BadNodeIdExists
         for node in self._nodes.values():
             stats["total_rows"] +=1
-
-            # Los nodos estan organizados desde en carpetas en el CSV
-            try:
-                folder = nodes.get_child([f"{idx}:{node["folder"]}"])
-            except Exception:
-                # no existe → crear
-                folder = nodes.add_folder(idx, node["folder"])
-                logger.info("Carpeta %s creada.",node["folder"])
+            alias = node["alias"]
+            nodeid = node["nodeid"]
+            folder_name = node["folder"]
+
+            # Los nodos estan organizados desde en carpetas en el CSV.
+            # La raiz se acaba de crear vacia: si no esta en la cache, no existe
+            folder = folders.get(folder_name)
+            if folder is None:
+                folder = folders[folder_name] = nodes.add_folder(idx, folder_name)
+                logger.info("Carpeta %s creada.",folder_name)
             try:
                 var = folder.add_variable(
-                    ua.NodeId(node["nodeid"], idx),
-                    node["alias"], node["initial"],
+                    ua.NodeId(nodeid, idx, ua.NodeIdType.String),
+                    alias, node["initial"],
                     varianttype=node["datatype"])
         
                 if node["writable"]:
-                    var.set_writable()
+                    writable_nodes.append(var)  # Se marcan todos juntos al final
 
-                logger.info("Nodo %s añadido en la carpeta %s.",node["alias"],node["folder"])
-                self._resolved_nodes.append(var)
+                logger.info("Nodo %s añadido en la carpeta %s.",alias,folder_name)
+                resolved_append(var)
+                resolved_by_nodeid[nodeid] = var
+                export_dict[alias] = var.nodeid.to_string()
+                vtypes[nodeid] = node["datatype"]
                 stats["resolved"] +=1
             except UaError as exc: 
 
                 code = getattr(exc, "code", None) or getattr(exc, "status", None)
 
-                if code == ua.StatusCodes.BadNodeIdExists:
-                    logger.warning("Nodo existente: %s ", node["alias"])
+                if code == bad_exists:
+                    logger.warning("Nodo existente: %s ", alias)
                     stats["duplicates"] += 1
                     continue
 
-                logger.exception("Nodo %s: error UA al añadir variable (status=%s)", node["alias"], code)
+                logger.exception("Nodo %s: error UA al añadir variable (status=%s)", alias, code)
                 stats["errors"] += 1
                 continue
         
             except Exception:
-                logger.exception("Nodo %s: error inesperado al añadir variable", node["alias"])
+                logger.exception("Nodo %s: error inesperado al añadir variable", alias)
                 stats["errors"] += 1
                 continue
 
+        # Permisos de escritura de todos los nodos en una sola pasada
+        self._set_writable_all(writable_nodes)
+
         # Arrancar el servidor automaticamente
         if not self.is_started:
             self.start()
@@ -424,10 +593,13 @@ class OpcServer:
         # Comprobar invariantes
         try:
             self._check_general_invariants()
-            self._check_nodes_resolved(stats=stats,root=nodes)
+            self._check_nodes_resolved(stats=stats,root=nodes,folders=folders)
         except AssertionError as exc:
             # Borrar estado
             self._resolved_nodes = []
+            self._resolved_by_nodeid = {}
+            self._export_dict = {}
+            self._vtypes = {}
             self._server.delete_nodes([root], recursive=True)
             raise OpcServerError(self._endpoint_url, "Invariantes de resolucion incumplidas", original=exc) from exc
 
@@ -450,24 +622,78 @@ class OpcServer:
         OpcServerError:
             Error en la escritura del nodo
         '''
+        self.write_nodes({nodeid: value})
+
+        # Se registra el valor pedido: releer el nodo duplicaria el coste de cada escritura
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Escritura realizada en variable '%s' con valor '%s'", nodeid, value)
+        return
+
+    def write_nodes(self, items: dict[str,Any]) -> None:
+        '''
+        Escribe varios nodos en una sola llamada al servicio Write interno.
+
+        Cada valor se comprueba y se envia con el VariantType de su nodo
+        (tipo del CSV): un float no acaba guardado en un nodo Int16.
+
+        Parameters
+        ----------
+        items: dict[str,Any]
+            Valores a escribir indexados por nodeid.
+
+        Raises
+        ------
+        OpcServerError:
+            Error en la obtencion de algun nodo
+
+        OpcServerError:
+            Valor no compatible con el tipo de algun nodo
+
+        OpcServerError:
+            Error en la escritura de algun nodo
+        '''
 
         assert self._resolved_nodes is not None
         assert self._server is not None
         assert self._idx is not None
 
+        if not items:
+            return
+
+        params = ua.WriteParameters()
+        resolved = self._resolved_by_nodeid
+        vtypes = self._vtypes
         try:
-            node = self._server.get_node(ua.NodeId(nodeid, self._idx, ua.NodeIdType.String))
-            assert node in self._resolved_nodes
+            for nodeid, value in items.items():
+                node = resolved.get(nodeid)
+                if node is None:
+                    raise KeyError(f"Nodo no resuelto: {nodeid}")
+                vtype = vtypes.get(nodeid)
+                if vtype is not None:
+                    # El servicio Write interno no comprueba el tipo: se valida aqui
+                    try:
+                        value = cast_value(value, vtype)
+                    except ValueError as exc:
+                        raise OpcServerError(self._endpoint_url, f"Valor no valido para {nodeid}", original=exc) from exc
+                wv = ua.WriteValue()
+                wv.NodeId = node.nodeid
+                wv.AttributeId = ua.AttributeIds.Value
+                wv.Value = ua.DataValue(ua.Variant(value, vtype))
+                params.NodesToWrite.append(wv)
+        except OpcServerError:
+            raise
         except Exception as exc:
             raise OpcServerError(self._endpoint_url,"Error en la obtencion del nodo en la escritura", original=exc) from exc
 
         try:
-            node.set_value(value)
+            results = self._server.iserver.isession.write(params)
+            for nodeid, status in zip(items, results):
+                if not status.is_good():
+                    raise OpcServerError(self._endpoint_url, f"Escritura rechazada en {nodeid} ({status.name})")
+        except OpcServerError:
+            raise
         except Exception as exc:
             raise OpcServerError(self._endpoint_url,"Error en la escritura del nodo", original=exc) from exc
-        
-        logging.info(f'Escritura realizada en variable \'{nodeid}\' con valor \'{node.get_value()}\'')
-        return
 
     def read_node(self,nodeid:str) -> None: 
         '''
@@ -491,44 +717,134 @@ class OpcServer:
         assert self._server is not None
         assert self._idx is not None
         
-        try:
-            node = self._server.get_node(ua.NodeId(nodeid, self._idx, ua.NodeIdType.String))
-            assert node in self._resolved_nodes
-        except Exception as exc:
-            raise OpcServerError(self._endpoint_url,"Error en la obtencion del nodo en la lectura", original=exc) from exc
+        node = self._resolved_by_nodeid.get(nodeid)
+        if node is None:
+            raise OpcServerError(self._endpoint_url,"Error en la obtencion del nodo en la lectura",
+                                 original=KeyError(f"Nodo no resuelto: {nodeid}"))
 
         try:
             value=node.get_value()
         except Exception as exc:
             raise OpcServerError(self._endpoint_url,"Error en la lectura del nodo", original=exc) from exc
         
-        logging.info(f'Lectura realizada en variable \'{nodeid}\' con valor \'{value}\'')
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Lectura realizada en variable '%s' con valor '%s'", nodeid, value)
         return
 
-    def export_nodes_to_json(self)->None:
+    def export_nodes_to_json(self, pretty: bool = False) -> Future | None:
         '''
         Exporta en un JSON la información de los nodos para los clientes.
+
+        El JSON se serializa en el hilo llamante y se escribe en segundo plano;
+        `stop(clean=True)` espera a la ultima escritura pendiente.
+
+        Parameters
+        ----------
+        pretty
+            Si es True el JSON se indenta para lectura humana;
+            por defecto se escribe compacto.
+
+        Returns
+        -------
+        Future or None
+            Escritura en curso (``result()`` lanza OpcServerError si falla),
+            o None si no hay nodos resueltos.
         '''
 
         if not self.nodes_resolved:
-            logging.exception("No existen nodos resueltos para exportar")
-            return
-
-        nodes_dict={}
+            logger.error("No existen nodos resueltos para exportar")
+            return None
 
-        # Actualizar el archivo de nodos por si varia el index
-        assert self._server is not None
-        root = self._server.get_root_node() # Cargar nodos añadidos
-        children = root.get_child(["0:Objects"])
-        build_node_dict(children, nodes_dict,self._idx)
+        # Los pares BrowseName/NodeId se recogen en resolve_nodes (con el index
+        # vigente): no hace falta recorrer el espacio de direcciones
+        nodes_dict = self._export_dict
 
-        # Escribir el archivo
+        # Serializado de una vez (orjson si esta disponible); la escritura va al hilo de E/S
         try:
-            with open(self._files_dir + self._nodes_output,"w",encoding="utf-8") as f:
-                json.dump(nodes_dict, f, ensure_ascii=False, indent=4)
+            payload = json_dumps(nodes_dict, pretty)
         except Exception as exc:
             raise OpcServerError(self._endpoint_url,"Error en la exportacion de nodos a JSON", original=exc) from exc 
-        return
+        if self._io_exec is None:
+            self._io_exec = ThreadPoolExecutor(max_workers=1, thread_name_prefix="opc-io")
+        self._last_export = self._io_exec.submit(self._write_export, payload)
+        return self._last_export
+
+    def _write_export(self, payload: bytes) -> None:
+        '''
+        Metodo privado que se ejecuta en el hilo de E/S: escribe el JSON y
+        traduce los errores a OpcServerError (visible en ``Future.result()``).
+        '''
+        try:
+            self._write_export_atomic(payload)
+        except Exception as exc:
+            logger.error("Error en la exportacion de nodos a JSON: %s", exc)
+            raise OpcServerError(self._endpoint_url,"Error en la exportacion de nodos a JSON", original=exc) from exc
+        logger.info("Nodos exportados a %s", self._output_path)
+
+    def _wait_export(self) -> None:
+        '''
+        Metodo privado que espera a la ultima exportacion en curso, si la hay.
+        El error ya se registro en el hilo de E/S: aqui no se relanza.
+        '''
+        pending, self._last_export = self._last_export, None
+        if pending is None:
+            return
+        try:
+            pending.result()
+        except Exception:
+            pass
+
+    def _write_export_atomic(self, payload: bytes) -> None:
+        '''
+        Metodo privado que escribe el JSON exportado en un temporal junto al
+        destino y lo renombra: los clientes nunca leen un archivo a medias.
+        '''
+        # nodes.json.tmp: no choca con otros archivos del mismo nombre base
+        tmp = self._output_path.with_suffix(self._output_path.suffix + ".tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(payload)
+                # En disco antes del rename: tras un corte no queda un JSON vacio
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._output_path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def _set_writable_all(self, nodes: list[Node]) -> None:
+        '''
+        Metodo privado que marca como escribibles (AccessLevel y UserAccessLevel
+        con CurrentWrite) todos los nodos indicados: una lectura y una escritura
+        en bloque en lugar de cuatro llamadas por nodo como `set_writable`.
+        '''
+        if not nodes:
+            return
+        assert self._server is not None
+        isession = self._server.iserver.isession
+        attrs = (ua.AttributeIds.AccessLevel, ua.AttributeIds.UserAccessLevel)
+
+        read = ua.ReadParameters()
+        for node in nodes:
+            for attr in attrs:
+                rv = ua.ReadValueId()
+                rv.NodeId = node.nodeid
+                rv.AttributeId = attr
+                read.NodesToRead.append(rv)
+
+        write = ua.WriteParameters()
+        for rv, dv in zip(read.NodesToRead, isession.read(read)):
+            # Se conserva el VariantType (Byte) del valor leido, como set_attr_bit
+            dv.Value.Value = ua.ua_binary.set_bit(dv.Value.Value, ua.AccessLevel.CurrentWrite)
+            wv = ua.WriteValue()
+            wv.NodeId = rv.NodeId
+            wv.AttributeId = rv.AttributeId
+            wv.Value = dv
+            write.NodesToWrite.append(wv)
+
+        for wv, status in zip(write.NodesToWrite, isession.write(write)):
+            if not status.is_good():
+                logger.error("Nodo %s: no se ha podido marcar como escribible (%s)", wv.NodeId.to_string(), status.name)
 
     def _register_index(self)->None:
         '''
@@ -543,9 +859,12 @@ class OpcServer:
             raise OpcServerError(self._endpoint_url, f"Error al registrar namespace: {self._namespace}", original=exc) from exc
         self._idx = idx
         self._check_general_invariants()
-        logger.info(f"Espacio de nombres {self._namespace} registrado en {self._endpoint_url} con indice: {self._idx}")
+        logger.info("Espacio de nombres %s registrado en %s con indice: %s", self._namespace, self._endpoint_url, self._idx)
 
     def _check_general_invariants(self) -> None:
+        # Con python -O los asserts desaparecen: no recorrer nada
+        if not __debug__:
+            return
         # Ciclo de vida coherente
         if self._server is None:
             assert self._idx is None, "idx debe ser None si el servidor no está creado"
@@ -563,7 +882,8 @@ class OpcServer:
         assert isinstance(self._namespace, str) and self._namespace, "namespace vacío"
 
     def _check_nodes_invariants(self) -> None:
-        from opcua import ua
+        if not __debug__:
+            return
 
         nodes = self._nodes
         assert isinstance(nodes, dict), "self._nodes debe ser dict"
@@ -581,7 +901,7 @@ class OpcServer:
 
             # Tipo correcto
             dt = nd["datatype"]
-            assert dt in ua.VariantType, f"datatype inválido en {alias}: {dt!r}"
+            assert dt in _VT_SET, f"datatype inválido en {alias}: {dt!r}"
 
             # initial no None
             assert nd["initial"] is not None, f"initial None en {alias}"
@@ -590,14 +910,20 @@ class OpcServer:
             if "writable" in nd:
                 assert isinstance(nd["writable"], bool), f"writable no bool en {alias}"
 
-    def _check_nodes_resolved(self,stats:dict, root: Node) -> None:
+    def _check_nodes_resolved(self,stats:dict, root: Node, folders: dict[str, Node]) -> None:
+        if not __debug__:
+            return
         assert stats["total_rows"] == stats["resolved"] + stats["duplicates"] + stats["errors"]
         assert self._resolved_nodes is not None
         assert len(self._resolved_nodes) == stats["resolved"]
-        # pertenencia y namespace
+        assert len(self._resolved_by_nodeid) == stats["resolved"]
+        # namespace: sin peticiones al servidor
         for n in self._resolved_nodes:
             assert n.nodeid.NamespaceIndex == self._idx
-            assert root in n.get_path()  # o comprueba padre recursivo
+        # pertenencia: cada variable cuelga de su carpeta (add_variable);
+        # basta comprobar el padre de cada carpeta una vez, no get_path por nodo
+        for f in folders.values():
+            assert f.get_parent() == root, f"Carpeta fuera de la raiz: {f}"
 
     @property
     def is_created(self) -> bool:
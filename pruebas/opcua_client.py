@@ -1,8 +1,10 @@
-import threading,queue,time,json,os
+import threading,queue,signal
+from pathlib import Path
+from itertools import islice
 import tkinter as tk
 from tkinter import ttk, messagebox
 from opcua import Client, ua
-from opcua_lib import SubHandler
+from opcua_lib import SubHandler, consume_notifications, json_loads
 
 '''
 Manejador que espera la librería python-opcua para entregar las notificaciones de una suscripción.
@@ -32,10 +34,13 @@ Parametros:
 #------------------------
 endpoint = Client("opc.tcp://127.0.0.1:4841")
 NS_IDX = 2 # Indice de namespace
+MAX_ITEMS_PER_CALL = 100 # Si el servidor no anuncia MaxMonitoredItemsPerCall (0 = sin limite)
+QUEUE_SIZE = 10 # Cambios retenidos por item si PublishingInterval > SamplingInterval
+
+HERE = Path(__file__).resolve().parent
 
 # Cargar nodos desde archivo
-with open(os.path.dirname(__file__)+"/nodes.json", "r", encoding="utf-8") as f:
-    VARIABLES = json.load(f)
+VARIABLES = json_loads((HERE / "nodes.json").read_bytes())
 
 try:
     endpoint.connect()
@@ -49,59 +54,64 @@ try:
     objects = endpoint.get_objects_node()
     print("Nodo de objetos:", objects)
 
-    # Acceder a las variables
-    
-    # **** ### SALIDAS PLC - ENTRADAS HALCON ### *****
-    Realizar_Vision = endpoint.get_node("ns=2;s=\"\".\"SALIDAS\".\"Realizar_Vision\"")
-    Espesor_Nominal = endpoint.get_node("ns=2;s=\"\".\"SALIDAS\".\"Espesor_Nominal\"")
-    Cargar_Fichero_1 = endpoint.get_node("ns=2;s=\"\".\"SALIDAS\".\"Cargar_Fichero_1\"")
-    Cargar_Fichero_2 = endpoint.get_node("ns=2;s=\"\".\"SALIDAS\".\"Cargar_Fichero_2\"")
-    Control_Esquinas_1 = endpoint.get_node("ns=2;s=\"\".\"SALIDAS\".\"Control_Esquinas_1\"")
-    Control_Esquinas_2 = endpoint.get_node("ns=2;s=\"\".\"SALIDAS\".\"Control_Esquinas_2\"")
-    Control_Perforaciones_1 = endpoint.get_node("ns=2;s=\"\".\"SALIDAS\".\"Control_Perforaciones_1\"")
-    Control_Perforaciones_2 = endpoint.get_node("ns=2;s=\"\".\"SALIDAS\".\"Control_Perforaciones_2\"")
-    Produccion = endpoint.get_node("ns=2;s=\"\".\"SALIDAS\".\"Produccion\"")
-    ID_Pizarra_In = endpoint.get_node("ns=2;s=\"\".\"SALIDAS\".\"ID_Pizarra\"")
-    LiveBit_In = endpoint.get_node("ns=2;s=\"\".\"SALIDAS\".\"LiveBit\"")
-
-    # **** ### ENTRADAS PLC - SALIDAS HALCON ### *****
-    COD_Error = endpoint.get_node("ns=2;s=\"\".\"ENTRADAS\".\"COD_Error\"")
-    Vision_Realizada = endpoint.get_node("ns=2;s=\"\".\"ENTRADAS\".\"Vision_Realizada\"")
-    Largo_Medido = endpoint.get_node("ns=2;s=\"\".\"ENTRADAS\".\"Largo_Medido\"")
-    Ancho_Medido = endpoint.get_node("ns=2;s=\"\".\"ENTRADAS\".\"Ancho_Medido\"")
-    Espesor_Medido = endpoint.get_node("ns=2;s=\"\".\"ENTRADAS\".\"Espesor_Medido\"")
-    Tercio_Visible = endpoint.get_node("ns=2;s=\"\".\"ENTRADAS\".\"Tercio_Visible\"")
-    Calidad_Tercio_1 = endpoint.get_node("ns=2;s=\"\".\"ENTRADAS\".\"Calidad_Tercio_1\"")
-    Calidad_Tercio_3 = endpoint.get_node("ns=2;s=\"\".\"ENTRADAS\".\"Calidad_Tercio_3\"")
-    Fichero_Cargado_1 = endpoint.get_node("ns=2;s=\"\".\"ENTRADAS\".\"Fichero_Cargado_1\"")
-    Fichero_Cargado_2 = endpoint.get_node("ns=2;s=\"\".\"ENTRADAS\".\"Fichero_Cargado_2\"")
-    ID_Pizarra_Out = endpoint.get_node("ns=2;s=\"\".\"ENTRADAS\".\"ID_Pizarra\"")
-    ID_Produccion_1 = endpoint.get_node("ns=2;s=\"\".\"ENTRADAS\".\"ID_Produccion_1\"")
-    ID_Produccion_2 = endpoint.get_node("ns=2;s=\"\".\"ENTRADAS\".\"ID_Produccion_2\"")
-    LiveBit_Out = endpoint.get_node("ns=2;s=\"\".\"ENTRADAS\".\"LiveBit\"")
-    
+    # Acceder a las variables: VARIABLES ya trae {nombre -> NodeId} exportado por el servidor
+    names = list(VARIABLES)
+    nodes = {name: endpoint.get_node(nid) for name, nid in VARIABLES.items()}
+
+    # Una sola peticion Read para todos los nodos, construida una vez:
+    # en cada sondeo solo viaja la peticion, sin un get_value() por variable
+    read_params = ua.ReadParameters()
+    read_params.MaxAge = 0
+    read_params.TimestampsToReturn = ua.TimestampsToReturn.Neither
+    for node in nodes.values():
+        rv = ua.ReadValueId()
+        rv.NodeId = node.nodeid
+        rv.AttributeId = ua.AttributeIds.Value
+        read_params.NodesToRead.append(rv)
+
     # Suscripción (periodo/publishing interval en ms)
     '''
     Se instancia un manejador de la clase SubHandler,
     que contedrá los métodos necesarios para manejar la notificaciones 
     de cambios y eventos.
     '''
-    handler = SubHandler()
+    notifications = queue.Queue()
+    name_by_nodeid = {node.nodeid.to_string(): name for name, node in nodes.items()}
+    handler = SubHandler(notifications, name_by_nodeid)
+    threading.Thread(target=consume_notifications, args=(notifications, name_by_nodeid), daemon=True).start()
 
     # Se crea la suscripción utilizando el método create_subscription del cliente OPC UA.
     sub = endpoint.create_subscription(500, handler)
 
-    # Se suscribe a los cambios en el nodo específico.
-    handle_cod_error = sub.subscribe_data_change(COD_Error)
-
-    # Ejemplo de escritura en una variable
-    while True:
-        # Leer el valor actual
-        current_value = COD_Error.get_value()
-        
-        # print(f"Valor actual de COD_Error: {current_value}")
-
-        time.sleep(10)  # Esperar 10 segundos antes de la siguiente iteración
+    # Lectura inicial en bloque (el servidor solo notifica cambios posteriores)
+    results = endpoint.uaclient.read(read_params)
+    values = {name: dv.Value.Value if dv.StatusCode.is_good() else dv.StatusCode.name
+              for name, dv in zip(names, results)}
+    print("Valores iniciales:", values)
+
+    # Limite de items por CreateMonitoredItems anunciado por el servidor
+    try:
+        max_items = endpoint.get_node(ua.ObjectIds.Server_ServerCapabilities_OperationLimits_MaxMonitoredItemsPerCall).get_value()
+    except Exception:
+        max_items = 0
+    max_items = max_items or MAX_ITEMS_PER_CALL
+
+    # Se suscribe a los cambios de todos los nodos con una peticion
+    # CreateMonitoredItems por bloque: sin sondeo y sin BadTooManyOperations
+    handles = []
+    pending = iter(nodes.values())
+    while chunk := list(islice(pending, max_items)):
+        handles.extend(sub.subscribe_data_change(chunk, queuesize=QUEUE_SIZE))
+
+    # Los valores llegan por SubHandler.datachange_notification:
+    # el hilo principal solo espera la señal de parada
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    # Espera con timeout: en Windows (Python < 3.14) un wait() sin limite no deja
+    # que el manejador de Ctrl+C se ejecute hasta que el evento se activa
+    while not stop.wait(1):
+        pass
 
 except Exception as e:
     print("Error:", e)
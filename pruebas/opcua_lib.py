@@ -1,6 +1,19 @@
 from opcua import Client, ua
-from typing import Final
-import json,os
+from typing import Any, Final
+import json
+from pathlib import Path
+# Copia a proposito de opc_project.opcua_lib.json_loads: los scripts de pruebas
+# se ejecutan sueltos desde esta carpeta (python opcua_server.py), sin el
+# paquete opc_project instalado ni en sys.path
+try:
+    import orjson
+except ImportError:  # Dependencia opcional: se usa json de la libreria estandar
+    orjson = None
+
+def json_loads(raw: bytes) -> Any:
+    # Parsea JSON desde bytes con orjson si esta instalado
+    # (orjson.JSONDecodeError hereda de json.JSONDecodeError)
+    return orjson.loads(raw) if orjson else json.loads(raw)
 
 # -----------------------
 # Cliente OPC UA
@@ -123,17 +136,34 @@ def build_node_dict(root_node, dic, idx_filter=None):
 # Handler de suscripción
 # -----------------------
 class SubHandler:
-    """Handler para recibir notificaciones de cambios"""
+    """
+    Handler para recibir notificaciones de cambios.
+
+    No hace peticiones al servidor ni imprime desde el hilo de callbacks:
+    encola tuplas ``(tipo, nodeid_str, valor, timestamp)`` y el consumidor
+    resuelve el nombre lógico con ``name_by_nodeid``.
+    """
+    def __init__(self, q, name_by_nodeid):
+        self._q = q
+        self.name_by_nodeid = name_by_nodeid # {nodeid_str -> nombre_lógico}
+
     def datachange_notification(self, node, val, data):
         # No meter trabajo pesado aquí (bloquea el hilo de callbacks)
-        try:
-            bn = node.get_browse_name()
-        except Exception:
-            bn = None
-        print(f"[DataChange] {bn or node}: {val}")
+        self._q.put(("dc", node.nodeid.to_string(), val, data.monitored_item.Value.SourceTimestamp))
 
     def event_notification(self, event):
-        print(f"[Event] {event}")
+        self._q.put(("ev", None, event, None))
+
+def consume_notifications(q, name_by_nodeid):
+    # Consumidor de la cola de SubHandler (hilo propio): aqui si se imprime
+    while True:
+        kind, nodeid_str, val, ts = q.get()
+        if kind == "dc":
+            print(f"[DataChange] {name_by_nodeid.get(nodeid_str, nodeid_str)}: {val} ({ts})")
+        elif kind == "ev":
+            print(f"[Event] {val}")
+        else:
+            print(f"[{kind}] {val}")
 
 if __name__ == "__main__":
     
@@ -143,8 +173,8 @@ if __name__ == "__main__":
     ENDPOINT = "opc.tcp://127.0.0.1:4841"
     NS_IDX = 2 # Indice de namespace
     # Cargar nodos desde archivo
-    with open(os.path.dirname(__file__)+"/nodes.json", "r", encoding="utf-8") as f:
-        VARIABLES = json.load(f)
+    HERE = Path(__file__).resolve().parent
+    VARIABLES = json_loads((HERE / "nodes.json").read_bytes())
 
     cliente = OpcClient(ENDPOINT,VARIABLES)
     pass
\ No newline at end of file
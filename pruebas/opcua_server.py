@@ -1,21 +1,21 @@
 from opcua import Server, ua
 from pathlib import Path
-from opcua_lib import build_node_dict
+from opcua_lib import json_loads
 from typing import Any
-import time, json, logging
+import json, logging, signal, threading
 
 
 # Crear servidor
 server = Server()
 server.set_endpoint("opc.tcp://127.0.0.1:4841")
 idx = server.register_namespace("CAFERSA")
-file_dir= Path (__file__).resolve()
-nodes_csv = Path(file_dir.parent) / "nodes.csv"
-nodes_json = Path(file_dir.parent) / "nodes.json"
+HERE = Path(__file__).resolve().parent
+nodes_json = HERE / "nodes.json"
 
 try:
-    with open(nodes_csv,"r",encoding="utf-8") as f:
-        nodes_dict = json.load(f)
+    # Mapeo exportado en el arranque anterior (el CSV no es JSON)
+    with open(nodes_json,"rb") as f:
+        nodes_dict = json_loads(f.read())
 except FileNotFoundError:
     print("El archivo no existe.")
     raise
@@ -26,65 +26,79 @@ except Exception as e:
     print("Otro error inesperado:", e)
     raise
 
-# Resolucion de nodos
-nodes = server.get_objects_node()
+# Nodos del servidor: (carpeta PLC, nombre en el PLC, BrowseName, valor inicial, escribible)
+NODES = (
+    # **** ### SALIDAS PLC - ENTRADAS HALCON ### *****
+    ("SALIDAS", "Realizar_Vision", "Realizar_Vision", 20.5, False),
+    ("SALIDAS", "Espesor_Nominal", "Espesor_Nominal", 0.0, False),
+    ("SALIDAS", "Cargar_Fichero_1", "Cargar_Fichero_1", False, False),
+    ("SALIDAS", "Cargar_Fichero_2", "Cargar_Fichero_2", False, False),
+    ("SALIDAS", "Control_Esquinas_1", "Control_Esquinas_1", False, False),
+    ("SALIDAS", "Control_Esquinas_2", "Control_Esquinas_2", False, False),
+    ("SALIDAS", "Control_Perforaciones_1", "Control_Perforaciones_1", False, False),
+    ("SALIDAS", "Control_Perforaciones_2", "Control_Perforaciones_2", False, False),
+    ("SALIDAS", "Produccion", "Produccion", False, False),
+    ("SALIDAS", "ID_Pizarra", "ID_Pizarra_In", 0, False),
+    ("SALIDAS", "LiveBit", "LiveBit_In", False, False),
+
+    # **** ### ENTRADAS PLC - SALIDAS HALCON ### *****
+    ("ENTRADAS", "COD_Error", "COD_Error", 0, True),
+    ("ENTRADAS", "COD_Error_2", "COD_Error_2", 0, True),
+    ("ENTRADAS", "Vision_Realizada", "Vision_Realizada", False, True),
+    ("ENTRADAS", "Largo_Medido", "Largo_Medido", 0.0, True),
+    ("ENTRADAS", "Ancho_Medido", "Ancho_Medido", 0.0, True),
+    ("ENTRADAS", "Espesor_Medido", "Espesor_Medido", 0.0, True),
+    ("ENTRADAS", "Tercio_Visible", "Tercio_Visible", 0, True),
+    ("ENTRADAS", "Calidad_Tercio_1", "Calidad_Tercio_1", 0, True),
+    ("ENTRADAS", "Calidad_Tercio_3", "Calidad_Tercio_3", 0, True),
+    ("ENTRADAS", "Fichero_Cargado_1", "Fichero_Cargado_1", False, True),
+    ("ENTRADAS", "Fichero_Cargado_2", "Fichero_Cargado_2", False, True),
+    ("ENTRADAS", "ID_Pizarra", "ID_Pizarra_Out", 0, True),
+    ("ENTRADAS", "ID_Produccion_1", "ID_Produccion_1", 0, True),
+    ("ENTRADAS", "ID_Produccion_2", "ID_Produccion_2", 0, True),
+    ("ENTRADAS", "LiveBit", "LiveBit_Out", False, True),
+)
 
-# **** ### SALIDAS PLC - ENTRADAS HALCON ### *****
-Realizar_Vision = nodes.add_variable(ua.NodeId("\"\".\"SALIDAS\".\"Realizar_Vision\"", idx), "Realizar_Vision", 20.5)
-Espesor_Nominal = nodes.add_variable(ua.NodeId("\"\".\"SALIDAS\".\"Espesor_Nominal\"", idx), "Espesor_Nominal", 0.0)
-Cargar_Fichero_1 = nodes.add_variable(ua.NodeId("\"\".\"SALIDAS\".\"Cargar_Fichero_1\"", idx), "Cargar_Fichero_1", False)
-Cargar_Fichero_2 = nodes.add_variable(ua.NodeId("\"\".\"SALIDAS\".\"Cargar_Fichero_2\"", idx), "Cargar_Fichero_2", False)
-Control_Esquinas_1 = nodes.add_variable(ua.NodeId("\"\".\"SALIDAS\".\"Control_Esquinas_1\"", idx), "Control_Esquinas_1", False)
-Control_Esquinas_2 = nodes.add_variable(ua.NodeId("\"\".\"SALIDAS\".\"Control_Esquinas_2\"", idx), "Control_Esquinas_2", False)
-Control_Perforaciones_1 = nodes.add_variable(ua.NodeId("\"\".\"SALIDAS\".\"Control_Perforaciones_1\"", idx), "Control_Perforaciones_1", False)
-Control_Perforaciones_2 = nodes.add_variable(ua.NodeId("\"\".\"SALIDAS\".\"Control_Perforaciones_2\"", idx), "Control_Perforaciones_2", False)
-Produccion = nodes.add_variable(ua.NodeId("\"\".\"SALIDAS\".\"Produccion\"", idx), "Produccion", False)
-ID_Pizarra_In = nodes.add_variable(ua.NodeId("\"\".\"SALIDAS\".\"ID_Pizarra\"", idx), "ID_Pizarra_In", 0)
-LiveBit_In = nodes.add_variable(ua.NodeId("\"\".\"SALIDAS\".\"LiveBit\"", idx), "LiveBit_In", False)
+# NodeIds construidos una vez, en el mismo orden que NODES
+NODE_IDS = tuple(ua.NodeId(f'""."{folder}"."{name}"', idx) for folder, name, *_ in NODES)
 
-# **** ### ENTRADAS PLC - SALIDAS HALCON ### *****
-COD_Error = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"COD_Error\"", idx), "COD_Error", 0)
-COD_Error_2 = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"COD_Error_2\"", idx), "COD_Error_2", 0)
-Vision_Realizada = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"Vision_Realizada\"", idx), "Vision_Realizada", False)
-Largo_Medido = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"Largo_Medido\"", idx), "Largo_Medido", 0.0)
-Ancho_Medido = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"Ancho_Medido\"", idx), "Ancho_Medido", 0.0)
-Espesor_Medido = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"Espesor_Medido\"", idx), "Espesor_Medido", 0.0)
-Tercio_Visible = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"Tercio_Visible\"", idx), "Tercio_Visible", 0)
-Calidad_Tercio_1 = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"Calidad_Tercio_1\"", idx), "Calidad_Tercio_1", 0)
-Calidad_Tercio_3 = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"Calidad_Tercio_3\"", idx), "Calidad_Tercio_3", 0)
-Fichero_Cargado_1 = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"Fichero_Cargado_1\"", idx), "Fichero_Cargado_1", False)
-Fichero_Cargado_2 = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"Fichero_Cargado_2\"", idx), "Fichero_Cargado_2", False)
-ID_Pizarra_Out = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"ID_Pizarra\"", idx), "ID_Pizarra_Out", 0)
-ID_Produccion_1 = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"ID_Produccion_1\"", idx), "ID_Produccion_1", 0)
-ID_Produccion_2 = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"ID_Produccion_2\"", idx), "ID_Produccion_2", 0)
-LiveBit_Out = nodes.add_variable(ua.NodeId("\"\".\"ENTRADAS\".\"LiveBit\"", idx), "LiveBit_Out", False)
+# Resolucion de nodos
+nodes = server.get_objects_node()
+variables = {}
+writable_nodes = []
+for nodeid, (_, _, browse_name, initial, writable) in zip(NODE_IDS, NODES):
+    var = nodes.add_variable(nodeid, browse_name, initial)
+    if writable:
+        writable_nodes.append(var)
+    variables[browse_name] = var
 
-# Hacer variables escribibles desde clientes
-COD_Error.set_writable()
-COD_Error_2.set_writable()
-Vision_Realizada.set_writable()
-Largo_Medido.set_writable()
-Ancho_Medido.set_writable()
-Espesor_Medido.set_writable()
-Tercio_Visible.set_writable()
-Calidad_Tercio_1.set_writable()
-Calidad_Tercio_3.set_writable()
-Fichero_Cargado_1.set_writable()
-Fichero_Cargado_2.set_writable()
-ID_Pizarra_Out.set_writable()
-ID_Produccion_1.set_writable()
-ID_Produccion_2.set_writable()
-LiveBit_Out.set_writable()
+# Hacer variables escribibles desde clientes: AccessLevel y UserAccessLevel de
+# todos los nodos en una sola peticion Write (add_variable los crea solo con CurrentRead)
+access = ua.AccessLevel.CurrentRead.mask | ua.AccessLevel.CurrentWrite.mask
+params = ua.WriteParameters()
+for var in writable_nodes:
+    for attr in (ua.AttributeIds.AccessLevel, ua.AttributeIds.UserAccessLevel):
+        wv = ua.WriteValue()
+        wv.NodeId = var.nodeid
+        wv.AttributeId = attr
+        # Un DataValue por escritura: el servidor guarda el objeto y puede modificarlo
+        wv.Value = ua.DataValue(ua.Variant(access, ua.VariantType.Byte))
+        params.NodesToWrite.append(wv)
+for wv, status in zip(params.NodesToWrite, server.iserver.isession.write(params)):
+    if not status.is_good():
+        print(f"No se ha podido marcar como escribible {wv.NodeId.to_string()}: {status.name}")
 
-# Actualizar el archivo de nodos por si varia el index
-root = server.get_root_node() # Cargar nodos añadidos
-children = root.get_child(["0:Objects"])
-build_node_dict(children, nodes_dict,idx)
+# Actualizar el archivo de nodos por si varia el index: los nodos añadidos
+# se conocen, no hace falta recorrer el espacio de direcciones
+nodes_dict.update({browse_name: var.nodeid.to_string() for browse_name, var in variables.items()})
 
 # Reescribir el archivo
 try:
-    with open(nodes_json,"w",encoding="utf-8") as f:
-        json.dump(nodes_dict, f, ensure_ascii=False, indent=4)
+    # json.dump hace una escritura por fragmento: se serializa entero y se escribe una vez,
+    # en binario (sin capa de texto) y con buffer de 1 MiB
+    payload = json.dumps(nodes_dict, ensure_ascii=False, indent=4).encode("utf-8")
+    with open(nodes_json,"wb",buffering=1 << 20) as f:
+        f.write(payload)
 except FileNotFoundError:
     print("El archivo no existe.")
     raise
@@ -99,12 +113,16 @@ except Exception as e:
 server.start()
 print("Servidor OPC UA iniciado en opc.tcp://127.0.0.1:4841")
 
-try:
-    while True:        
-        time.sleep(1)
-except KeyboardInterrupt:
-    print('Servidor desconectado')
-    server.stop()
+# El servidor atiende en sus propios hilos: el principal solo espera la señal de parada
+stop = threading.Event()
+signal.signal(signal.SIGINT, lambda *_: stop.set())
+signal.signal(signal.SIGTERM, lambda *_: stop.set())
+# Espera con timeout: en Windows (Python < 3.14) un wait() sin limite no deja
+# que el manejador de Ctrl+C se ejecute hasta que el evento se activa
+while not stop.wait(1):
+    pass
+print('Servidor desconectado')
+server.stop()
 
 if __name__=="__main__":
     pass
\ No newline at end of file
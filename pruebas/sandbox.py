@@ -1,32 +1,42 @@
+from typing import Any
+from opcua import ua
+
 class OpcClient:
     def __init__(self, endpoint_url: str):
         self.endpoint_url = endpoint_url
         self.client = None
         self.aliases: dict[str, str] = {}     # config (alias -> nodeid_str)
+        self.nodeids: dict[str, ua.NodeId] = {}  # config parseada una vez (alias -> ua.NodeId)
         self.nodes: dict[str, Any] = {}       # runtime (alias -> ua.Node), se llena tras connect()
 
     def load_aliases(self, mapping: dict[str, str]) -> None:
         # validar aquí: tipos, duplicados, formato básico de nodeid
         self.aliases = dict(mapping)
+        # El NodeId se parsea aqui y no en cada get_node()
+        self.nodeids = {alias: ua.NodeId.from_string(nodeid) for alias, nodeid in self.aliases.items()}
 
     def connect(self) -> None:
         # ... abre sesión ...
         self._resolve_nodes()  # llena self.nodes usando self.client.get_node()
 
     def _resolve_nodes(self) -> None:
+        # Tras connect() todos los alias tienen su ua.Node: es la única fuente
         self.nodes.clear()
-        for alias, nodeid in self.aliases.items():
+        for alias, nodeid in self.nodeids.items():
             self.nodes[alias] = self.client.get_node(nodeid)
 
     def disconnect(self) -> None:
         # ... cierra sesión ...
         self.nodes.clear()  # invalidar caché ligada a la sesión
 
-    # Azúcar de uso con alias
+    # Azúcar de uso con alias (alias desconocido o sin conectar -> KeyError)
     def read_alias(self, alias: str):
-        node = self.nodes.get(alias) or self.client.get_node(self.aliases[alias])
-        return node.get_value()
+        return self.nodes[alias].get_value()
+
+    def read_aliases(self, aliases: list[str]) -> dict[str, Any]:
+        # Una sola petición Read para todos los alias
+        nodes = self.nodes
+        return dict(zip(aliases, self.client.get_values([nodes[a] for a in aliases])))
 
     def write_alias(self, alias: str, value):
-        node = self.nodes.get(alias) or self.client.get_node(self.aliases[alias])
-        node.set_value(value)
+        self.nodes[alias].set_value(value)
@@ -1,17 +1,20 @@
 from pathlib import Path
 from opc_project.opcua_lib import setup_logging
 from opc_project.opcua_server import  OpcServer,__version__,logger
-import time,argparse
+import argparse,signal,threading
     
+# Directorio del proyecto (resuelto una vez)
+HERE = Path(__file__).resolve().parent
+
 # Parametros por defecto de constructor
 endpoint_url="opc.tcp://127.0.0.1:4841"
 namespace = "CAFERSA"
-files_dir = (Path(__file__).resolve().parent).as_posix()+"/opc_project/files/"
+files_dir = (HERE / "opc_project" / "files").as_posix()
 nodes_input_file = "nodes.csv"
 nodes_output_file = "nodes.json" 
 
 # Parametros por defecto logging
-log_path = Path (__file__).resolve().parent / "opc_project/logs/server.log"
+log_path = HERE / "opc_project" / "logs" / "server.log"
 level = "INFO"
 
 # Argumentos CLI - Constructor
@@ -21,6 +24,7 @@ parser.add_argument("--namespace",default=namespace)
 parser.add_argument("--files",default=files_dir)
 parser.add_argument("--nodes_in",default=nodes_input_file)
 parser.add_argument("--nodes_out",default=nodes_output_file)
+parser.add_argument("--pretty",action="store_true",help="Exporta el JSON de nodos indentado")
 
 # Argumentos CLI - Logging
 parser.add_argument("--log",default=log_path)
@@ -42,12 +46,18 @@ server = OpcServer(
 server.create()
 server.load_nodes_from_csv()
 server.resolve_nodes()
-server.export_nodes_to_json()
-
-try:
-    print('Servidor escuchando')
-    while True:        
-        time.sleep(1)
-except KeyboardInterrupt:
-    print('Servidor desconectado')
+export = server.export_nodes_to_json(pretty=args.pretty)
+if export is not None:
+    export.result() # Los clientes leen el JSON al arrancar: que este escrito
+
+# El servidor atiende en sus propios hilos: el principal solo espera la señal de parada
+stop = threading.Event()
+signal.signal(signal.SIGINT, lambda *_: stop.set())
+signal.signal(signal.SIGTERM, lambda *_: stop.set())
+print('Servidor escuchando')
+# Espera con timeout: en Windows (Python < 3.14) un wait() sin limite no deja
+# que el manejador de Ctrl+C se ejecute hasta que el evento se activa
+while not stop.wait(1):
+    pass
+print('Servidor desconectado')
 server.stop(clean=True)
\ No newline at end of file
@@ -3,10 +3,13 @@ from opc_project.opcua_lib import setup_logging
 from opc_project.opcua_server import  OpcServer,__version__,logger
 import argparse
 
+# Directorio del proyecto (resuelto una vez)
+HERE = Path(__file__).resolve().parent
+
 # Parametros por defecto de constructor
 endpoint_url="opc.tcp://127.0.0.1:4841"
 namespace = "CAFERSA"
-files_dir = (Path(__file__).resolve().parent).as_posix() + "/opc_project/files/"
+files_dir = (HERE / "opc_project" / "files").as_posix()
 nodes_input_file = "nodes.csv"
 nodes_output_file = "nodes.json" 
 
@@ -18,7 +21,7 @@ srv = OpcServer(
     nodes_output_file="nodes.json")
 
 # Parametros por defecto logging
-log_path = Path (__file__).resolve().parent / "opc_project/logs/server.log"
+log_path = HERE / "opc_project" / "logs" / "server.log"
 level = "INFO"
 
 # Argumentos CLI - Constructor
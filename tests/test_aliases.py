@@ -7,7 +7,7 @@ def test_load_aliases_from_json_ok():
     # Crear un archivo JSON temporal valido
     data = {
         "MotorStart":"ns=2;i=3",
-        "MotorStart":"ns=2;i=4",
+        "MotorStop":"ns=2;i=4",
     }
     with tempfile.NamedTemporaryFile("w+",delete=False,suffix=".json") as tmp:
         json.dump(data,tmp)
@@ -16,5 +16,6 @@ def test_load_aliases_from_json_ok():
         cli = OpcClient("opc.tcp://localhost:4841")
         cli.load_aliases_from_json(str(tmp_path))
         assert cli.aliases == data
+        assert len(cli.aliases) == 2
     finally:
         tmp_path.unlink()
\ No newline at end of file
@@ -0,0 +1,54 @@
+import csv
+from pathlib import Path
+import pytest
+from opcua import Client
+from opc_project.opcua_server import OpcServer
+from opc_project.opcua_lib import build_node_dict
+
+FILES_DIR = (Path(__file__).resolve().parent.parent / "opc_project" / "files").as_posix() + "/"
+
+@pytest.fixture(scope="module")
+def server():
+    srv = OpcServer(
+        endpoint_url="opc.tcp://127.0.0.1:4843",
+        namespace="urn:test:browse",
+        files_dir=FILES_DIR,
+        nodes_input_file="nodes.csv",
+        nodes_output_file="nodes.json"
+    )
+    srv.resolve_nodes()
+    yield srv
+    srv.stop(clean=True)
+
+def test_build_node_dict_finds_all_variables(server: OpcServer):
+    with open(FILES_DIR + "nodes.csv", encoding="utf-8") as f:
+        expected = {row["alias"] for row in csv.DictReader(f) if row["alias"]}
+
+    dic = {}
+    objects = server._server.get_objects_node()
+    build_node_dict(objects, dic, server._idx)
+
+    # Las variables estan dentro de carpetas: requiere bajar mas de un nivel
+    assert set(dic) == expected
+    assert dic["Espesor_Nominal"] == f"ns={server._idx};s=Espesor_Nominal"
+    # Sin diccionario de salida se devuelve uno nuevo
+    assert build_node_dict(objects, idx_filter=server._idx) == dic
+
+def test_build_node_dict_over_client_session(server: OpcServer):
+    # Mismo recorrido con nodos de cliente: las lecturas en bloque van por UaClient.read
+    client = Client("opc.tcp://127.0.0.1:4843")
+    client.connect()
+    try:
+        from_client = {}
+        build_node_dict(client.get_objects_node(), from_client, server._idx)
+    finally:
+        client.disconnect()
+
+    from_server = {}
+    build_node_dict(server._server.get_objects_node(), from_server, server._idx)
+    assert from_client == from_server
+
+def test_export_dict_matches_browse(server: OpcServer):
+    # El JSON se exporta desde lo recogido en resolve_nodes, sin recorrer el servidor
+    browsed = build_node_dict(server._server.get_objects_node(), idx_filter=server._idx)
+    assert server._export_dict == browsed
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import threading
+import time
+from pathlib import Path
+import pytest
+from opcua import Client, ua
+from opcua.ua.uaerrors import BadUserAccessDenied
+from opc_project.opcua_lib import backoff_delay
+from opc_project.opcua_server import OpcServer
+from opc_project.opcua_client import OpcClient, OpcClientError, ConnectionError, NodeReadError
+
+FILES_DIR = (Path(__file__).resolve().parent.parent / "opc_project" / "files").as_posix() + "/"
+ENDPOINT = "opc.tcp://127.0.0.1:4842"
+
+@pytest.fixture(scope="module")
+def server():
+    srv = OpcServer(
+        endpoint_url=ENDPOINT,
+        namespace="urn:test:client",
+        files_dir=FILES_DIR,
+        nodes_input_file="nodes.csv",
+        nodes_output_file="nodes.json"
+    )
+    srv.resolve_nodes()  # incluye creacion, carga CSV y arranque
+    yield srv
+    srv.stop(clean=True)
+
+@pytest.fixture
+def aliases_file(server: OpcServer, tmp_path: Path):
+    # Alias -> nodeid tal y como los exporta el servidor
+    data = {alias: f"ns={server._idx};s={alias}" for alias in ("Espesor_Medido", "Vision_Realizada", "Produccion")}
+    path = tmp_path / "nodes.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return path
+
+def test_read_and_write_nodes(aliases_file: Path):
+    with OpcClient(ENDPOINT) as cli:
+        cli.load_aliases_from_json(str(aliases_file))
+
+        cli.write_nodes({"Espesor_Medido": 4.2, "Vision_Realizada": True})
+        values = cli.read_nodes(list(cli.aliases))
+
+        assert list(values) == list(cli.aliases)
+        assert values["Espesor_Medido"] == pytest.approx(4.2)
+        assert values["Vision_Realizada"] is True
+        assert values["Produccion"] == 0
+        assert cli.read_nodes([]) == {}
+
+def test_read_params_reused(aliases_file: Path):
+    with OpcClient(ENDPOINT) as cli:
+        cli.load_aliases_from_json(str(aliases_file))
+        cli.read_nodes(["Produccion", "Espesor_Medido"])
+        params = cli._read_params[("Produccion", "Espesor_Medido")]
+        assert cli.read_nodes(["Produccion", "Espesor_Medido"])["Produccion"] == 0
+        assert cli._read_params[("Produccion", "Espesor_Medido")] is params
+        # Al recargar los alias los NodeIds pueden cambiar
+        cli.load_aliases_from_json(str(aliases_file))
+        assert cli._read_params == {}
+    assert cli._read_params == {}
+
+def test_read_nodes_reports_bad_status(server: OpcServer, tmp_path: Path):
+    path = tmp_path / "nodes.json"
+    path.write_text(json.dumps({"Produccion": f"ns={server._idx};s=Produccion",
+                                "Fantasma": f"ns={server._idx};s=NoExiste"}), encoding="utf-8")
+    with OpcClient(ENDPOINT) as cli:
+        cli.load_aliases_from_json(str(path))
+        with pytest.raises(NodeReadError, match="BadNodeIdUnknown") as info:
+            cli.read_nodes(["Produccion", "Fantasma"])
+        assert info.value.nodeid == "Fantasma"
+        assert cli.read_nodes(["Produccion"]) == {"Produccion": 0}
+
+def test_async_context_manager(aliases_file: Path):
+    async def run():
+        async with OpcClient(ENDPOINT) as cli:
+            cli.load_aliases_from_json(str(aliases_file))
+            return cli, cli.read_nodes(["Produccion"])
+    cli, values = asyncio.run(run())
+    assert values == {"Produccion": 0}
+    assert not cli.is_connected
+
+def test_writes_keep_node_datatype(server: OpcServer, tmp_path: Path):
+    path = tmp_path / "nodes.json"
+    path.write_text(json.dumps({alias: f"ns={server._idx};s={alias}" for alias in ("COD_Error", "Tercio_Visible")}),
+                    encoding="utf-8")
+    with OpcClient(ENDPOINT) as cli:
+        cli.load_aliases_from_json(str(path))
+        cli.write_node("COD_Error", 3)
+        cli.write_nodes({"COD_Error": 4, "Tercio_Visible": 2})
+        # Sin el tipo del nodo python-opcua enviaria Int64 para un int de Python
+        dv = cli._get_node_by_alias("COD_Error").get_data_value()
+        assert dv.Value.VariantType == ua.VariantType.Int16
+        assert dv.Value.Value == 4
+        dv = cli._get_node_by_alias("Tercio_Visible").get_data_value()
+        assert dv.Value.VariantType == ua.VariantType.Byte
+
+def test_nodes_registered_on_load(aliases_file: Path):
+    cli = OpcClient(ENDPOINT)
+    cli.connect()
+    try:
+        cli.load_aliases_from_json(str(aliases_file))
+        assert cli._registered
+        assert set(cli._nodes) == set(cli.aliases)
+        assert cli.read_node("Produccion") == 0
+    finally:
+        cli.disconnect()
+    assert not cli._registered
+    assert cli._nodes == {}
+
+    # Al reconectar se vuelven a registrar los alias ya cargados
+    with cli:
+        assert cli._registered
+        assert cli.read_node("Produccion") == 0
+
+def wait_for(predicate, timeout_s: float = 3.0) -> bool:
+    t_end = time.monotonic() + timeout_s
+    while time.monotonic() < t_end:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_value_cache_follows_changes(aliases_file: Path):
+    with OpcClient(ENDPOINT) as cli:
+        cli.load_aliases_from_json(str(aliases_file))
+        cli.enable_cache(period_ms=50)
+        assert wait_for(lambda: set(cli._value_cache) == set(cli.aliases))
+
+        cli.write_node("Espesor_Medido", 7.5)
+        assert wait_for(lambda: cli._value_cache["Espesor_Medido"] == 7.5)
+        assert cli.read_node("Espesor_Medido") == pytest.approx(7.5)
+
+    assert cli._value_cache is None
+    assert cli._subscription is None
+
+def test_value_cache_updated_on_write(aliases_file: Path):
+    with OpcClient(ENDPOINT) as cli:
+        cli.load_aliases_from_json(str(aliases_file))
+        cli.enable_cache(period_ms=50)
+        assert wait_for(lambda: set(cli._value_cache) == set(cli.aliases))
+
+        # Lectura inmediata tras escribir, sin esperar a la notificacion
+        cli.write_node("Espesor_Medido", 9.5)
+        assert cli.read_node("Espesor_Medido") == 9.5
+        flag = not cli._value_cache["Vision_Realizada"]
+        cli.write_nodes({"Vision_Realizada": flag})
+        assert cli.read_node("Vision_Realizada") is flag
+
+def test_connect_retries_exhausted():
+    cli = OpcClient("opc.tcp://127.0.0.1:4849")  # sin servidor escuchando
+    with pytest.raises(ConnectionError):
+        cli.connect(retries=2, backoff_s=0.01)
+    assert not cli.is_connected
+
+def test_backoff_delay_is_exponential_and_bounded():
+    assert backoff_delay(1, 1.0, jitter=0.0) == 1.0
+    assert backoff_delay(3, 1.0, jitter=0.0) == 4.0
+    assert backoff_delay(10, 1.0, max_delay_s=5.0, jitter=0.0) == 5.0
+    assert 2.0 <= backoff_delay(2, 1.0, jitter=0.5) <= 3.0
+
+def test_connect_fatal_error_not_retried(monkeypatch: pytest.MonkeyPatch):
+    calls = []
+    def rejected(self):
+        calls.append(self)
+        raise BadUserAccessDenied()
+    monkeypatch.setattr(Client, "connect", rejected)
+    cli = OpcClient("opc.tcp://127.0.0.1:4849")
+    with pytest.raises(ConnectionError, match="rechazada"):
+        cli.connect(retries=3, backoff_s=0.01)
+    assert len(calls) == 1
+    assert not cli.is_connected
+
+def test_connect_reuses_client_across_retries(monkeypatch: pytest.MonkeyPatch):
+    used = []
+    def unreachable(self):
+        used.append(self)
+        raise OSError("sin servidor")
+    monkeypatch.setattr(Client, "connect", unreachable)
+    cli = OpcClient("opc.tcp://127.0.0.1:4849")
+    with pytest.raises(ConnectionError):
+        cli.connect(retries=5, backoff_s=0.001, jitter=0.0)
+    # Todos los intentos usan la misma instancia de Client
+    assert len(used) == 5
+    assert len({id(c) for c in used}) == 1
+
+def test_clients_share_session(aliases_file: Path):
+    a = OpcClient(ENDPOINT)
+    b = OpcClient(ENDPOINT)
+    with a:
+        with b:
+            assert a.client is b.client
+            assert OpcClient._pool[ENDPOINT][1] == 2
+            b.load_aliases_from_json(str(aliases_file))
+        # Liberar b no cierra la sesion de a
+        assert not b.is_connected
+        assert OpcClient._pool[ENDPOINT][1] == 1
+        a.load_aliases_from_json(str(aliases_file))
+        assert a.read_node("Produccion") == 0
+    assert ENDPOINT not in OpcClient._pool
+    assert ENDPOINT not in OpcClient._open_locks
+
+def test_dead_shared_session_is_replaced(server: OpcServer, monkeypatch: pytest.MonkeyPatch):
+    a = OpcClient(ENDPOINT)
+    b = OpcClient(ENDPOINT)
+    with a:
+        monkeypatch.setattr(OpcClient, "_session_alive", staticmethod(lambda client: False))
+        with b:
+            assert b.client is not a.client
+            assert OpcClient._pool[ENDPOINT] == (b.client, 1)
+        # a cierra su propia sesion sin tocar el pool
+        assert ENDPOINT not in OpcClient._pool
+    assert ENDPOINT not in OpcClient._pool
+
+def test_concurrent_connects_share_one_session(server: OpcServer):
+    clients = [OpcClient(ENDPOINT) for _ in range(4)]
+    threads = [threading.Thread(target=cli.connect) for cli in clients]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    try:
+        assert all(cli.client is clients[0].client for cli in clients)
+        assert OpcClient._pool[ENDPOINT][1] == len(clients)
+    finally:
+        for cli in clients:
+            cli.disconnect()
+    assert ENDPOINT not in OpcClient._pool
+
+def test_slow_endpoint_does_not_block_others(server: OpcServer):
+    # Un endpoint sin servidor reintentando no retiene el lock del pool
+    slow = OpcClient("opc.tcp://127.0.0.1:4849")
+    t = threading.Thread(target=lambda: pytest.raises(ConnectionError, slow.connect, retries=3, backoff_s=0.5))
+    t.start()
+    try:
+        time.sleep(0.1)
+        t0 = time.monotonic()
+        with OpcClient(ENDPOINT) as cli:
+            assert cli.is_connected
+        assert time.monotonic() - t0 < 0.5
+    finally:
+        t.join()
+
+def test_error_messages():
+    exc = NodeReadError("Produccion", "Error de lectura de nodo")
+    assert str(exc) == "Error de lectura de nodo:Produccion"
+    assert exc.nodeid == "Produccion"
+    exc = ConnectionError(ENDPOINT, "Timeout de conexión")
+    assert str(exc) == f"Timeout de conexión (endpoint={ENDPOINT})"
+
+def test_client_has_fixed_attributes():
+    cli = OpcClient(ENDPOINT)
+    with pytest.raises(AttributeError):
+        cli.nodes = {}  # type: ignore
+
+def test_operations_without_session_fail(aliases_file: Path):
+    cli = OpcClient(ENDPOINT)
+    cli.load_aliases_from_json(str(aliases_file))
+    assert not cli.is_connected
+    with pytest.raises(OpcClientError) as info:
+        cli.read_nodes(["Produccion"])
+    assert str(info.value.__cause__) == "Cliente no conectado"
+    with pytest.raises(OpcClientError):
+        cli.write_node("Espesor_Medido", 1.0)
+    with pytest.raises(OpcClientError):
+        cli.read_node("Produccion")
+
+def test_load_aliases_invalid_nodeid(tmp_path: Path):
+    path = tmp_path / "nodes.json"
+    path.write_text(json.dumps({"Produccion": "ns=dos;s=Produccion"}), encoding="utf-8")
+    cli = OpcClient(ENDPOINT)
+    with pytest.raises(OpcClientError, match="NodeIds inválidos"):
+        cli.load_aliases_from_json(str(path))
+    assert cli.aliases == {}
@@ -0,0 +1,49 @@
+import logging
+import pytest
+from opcua import ua
+from opc_project.opcua_lib import setup_logging, json_dumps, json_loads, cast_value
+
+@pytest.fixture
+def root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    setup_logging.cache_clear()
+    yield root
+    setup_logging.cache_clear()
+    for h in root.handlers:
+        h.close()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+def test_setup_logging_idempotent_and_reconfigurable(root_logger: logging.Logger):
+    setup_logging("DEBUG")
+    handlers = root_logger.handlers[:]
+    assert root_logger.level == logging.DEBUG
+
+    # Misma configuracion: no se crean handlers nuevos
+    setup_logging("DEBUG")
+    assert root_logger.handlers == handlers
+
+    # Configuracion distinta: se aplica aunque ya hubiera handlers
+    setup_logging("WARNING")
+    assert root_logger.level == logging.WARNING
+    assert root_logger.handlers != handlers
+
+def test_json_dumps_compact_by_default():
+    data = {"Produccion": "ns=2;s=Produccion", "Año": "ns=2;s=Año"}
+    assert json_dumps(data) == '{"Produccion":"ns=2;s=Produccion","Año":"ns=2;s=Año"}'.encode("utf-8")
+    pretty = json_dumps(data, pretty=True)
+    assert pretty.startswith(b'{\n  "Produccion"')
+    assert json_loads(pretty) == json_loads(json_dumps(data)) == data
+
+def test_cast_value_matches_node_type():
+    assert cast_value(3, ua.VariantType.Int16) == 3
+    assert cast_value("3", ua.VariantType.Int16) == 3
+    assert cast_value(2, ua.VariantType.Double) == 2.0
+    assert cast_value("1,5", ua.VariantType.Double) == 1.5
+    assert cast_value("true", ua.VariantType.Boolean) is True
+    for value, vtype in ((2.5, ua.VariantType.Int16), (1.0, ua.VariantType.Boolean),
+                         (True, ua.VariantType.Int16), (256, ua.VariantType.Byte),
+                         (3, ua.VariantType.String)):
+        with pytest.raises(ValueError):
+            cast_value(value, vtype)
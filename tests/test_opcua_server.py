@@ -1,6 +1,19 @@
+import asyncio
+import gc
+import json
+import os
+import shutil
+import time
 import pytest
+from pathlib import Path
+from opcua import ua
 from opc_project.opcua_server import OpcServer, OpcServerError
 
+FILES_DIR = (Path(__file__).resolve().parent.parent / "opc_project" / "files").as_posix() + "/"
+
+def string_nodeid(name: str, idx: int) -> ua.NodeId:
+    return ua.NodeId(name, idx, ua.NodeIdType.String)
+
 @pytest.fixture
 def server():
     srv = OpcServer(
@@ -64,3 +77,204 @@ def test_start_with_invalid_endpoint():
         srv.start(retries=1)
     assert srv._server is None
     assert srv._idx is None
+
+def test_context_manager_stops_on_error():
+    srv = OpcServer(
+        endpoint_url="opc.tcp://127.0.0.1:4844",
+        namespace="urn:test",
+        files_dir=".",
+        nodes_input_file="nodes.csv",
+        nodes_output_file="nodes.json"
+    )
+    with pytest.raises(KeyError):
+        with srv:
+            assert srv.is_started
+            raise KeyError("fallo dentro del bloque")
+    assert not srv.is_created
+    assert srv._finalizer is None
+
+    async def run():
+        async with srv:
+            assert srv.is_started
+    asyncio.run(run())
+    assert not srv.is_created
+
+def test_finalizer_stops_abandoned_server():
+    srv = OpcServer(
+        endpoint_url="opc.tcp://127.0.0.1:4845",
+        namespace="urn:test",
+        files_dir=".",
+        nodes_input_file="nodes.csv",
+        nodes_output_file="nodes.json"
+    )
+    srv.start()
+    finalizer = srv._finalizer
+    assert finalizer is not None and finalizer.alive
+    del srv
+    gc.collect()
+    assert not finalizer.alive
+
+def test_write_and_read_resolved_node():
+    srv = OpcServer(
+        endpoint_url="opc.tcp://127.0.0.1:4846",
+        namespace="urn:test",
+        files_dir=FILES_DIR,
+        nodes_input_file="nodes.csv",
+        nodes_output_file="nodes.json"
+    )
+    with srv:
+        srv.resolve_nodes()
+        srv.write_node("COD_Error", 5)
+        srv.write_node("COD_Error", 6)
+        srv.read_node("COD_Error")
+
+        dv = srv._server.get_node(string_nodeid("COD_Error", srv._idx)).get_data_value()
+        assert dv.Value.Value == 6
+        assert dv.Value.VariantType == ua.VariantType.Int16
+
+        srv.write_nodes({"COD_Error": 7, "Tercio_Visible": 2, "Espesor_Medido": 1.5})
+        node = srv._server.get_node(string_nodeid("Tercio_Visible", srv._idx))
+        assert node.get_data_value().Value.VariantType == ua.VariantType.Byte
+        with pytest.raises(OpcServerError, match="obtencion"):
+            srv.write_nodes({"NoExiste": 1})
+        # El valor debe encajar en el tipo del nodo: nada se escribe si uno falla
+        with pytest.raises(OpcServerError, match="COD_Error"):
+            srv.write_nodes({"Tercio_Visible": 3, "COD_Error": 2.5})
+        with pytest.raises(OpcServerError, match="Vision_Realizada"):
+            srv.write_node("Vision_Realizada", 1.0)
+        with pytest.raises(OpcServerError, match="COD_Error"):
+            srv.write_node("COD_Error", 40000)
+        value = lambda name: srv._server.get_node(string_nodeid(name, srv._idx)).get_value()
+        assert value("COD_Error") == 7 and value("Tercio_Visible") == 2
+        srv.write_nodes({"Espesor_Medido": 2, "COD_Error": "8"})
+        assert value("COD_Error") == 8
+        dv = srv._server.get_node(string_nodeid("Espesor_Medido", srv._idx)).get_data_value()
+        assert dv.Value.Value == 2.0 and dv.Value.VariantType == ua.VariantType.Double
+
+        # Solo las ENTRADAS quedan escribibles para los clientes
+        access = srv._server.get_node(string_nodeid("COD_Error", srv._idx)).get_user_access_level()
+        assert ua.AccessLevel.CurrentWrite in access
+        access = srv._server.get_node(string_nodeid("Produccion", srv._idx)).get_user_access_level()
+        assert ua.AccessLevel.CurrentWrite not in access
+    # La parada limpia descarta los nodos resueltos del servidor anterior
+    assert not srv.nodes_resolved
+    assert srv._resolved_by_nodeid == {} and srv._export_dict == {} and srv._vtypes == {}
+    assert srv.export_nodes_to_json() is None
+
+def test_reload_csv_merges_only_new_rows():
+    srv = OpcServer(
+        endpoint_url="opc.tcp://127.0.0.1:4847",
+        namespace="urn:test",
+        files_dir=FILES_DIR,
+        nodes_input_file="nodes.csv",
+        nodes_output_file="nodes.json"
+    )
+    first = srv.load_nodes_from_csv()
+    assert first["loaded"] > 0 and first["duplicates"] == 0
+    catalog = srv._nodes
+    entry = catalog["Produccion"]
+
+    # Segunda carga: todas las filas ya existen y el catalogo se conserva
+    second = srv.load_nodes_from_csv()
+    assert second["loaded"] == 0
+    assert second["duplicates"] == first["loaded"]
+    assert srv._nodes == catalog
+    assert srv._nodes["Produccion"] is entry
+
+def test_unchanged_csv_is_not_parsed_again(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    csv_path = tmp_path / "nodes.csv"
+    shutil.copy(Path(FILES_DIR) / "nodes.csv", csv_path)
+    srv = OpcServer("opc.tcp://127.0.0.1:4847", "urn:test", str(tmp_path), "nodes.csv", "nodes.json")
+    first = srv.load_nodes_from_csv()
+
+    # Mismo archivo: se reutilizan las filas parseadas con las mismas metricas
+    parsed = []
+    original = OpcServer._parse_csv_rows
+    monkeypatch.setattr(OpcServer, "_parse_csv_rows", lambda self, *a: parsed.append(a) or original(self, *a))
+    srv._nodes = None
+    assert srv.load_nodes_from_csv() == first
+    second = srv.load_nodes_from_csv()
+    assert second["duplicates"] == first["loaded"]
+    assert parsed == []
+
+    # Si cambia el archivo se vuelve a parsear
+    st = csv_path.stat()
+    os.utime(csv_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    srv.load_nodes_from_csv()
+    assert len(parsed) == 1
+
+def test_paths_join_with_or_without_separator():
+    # files_dir sin separador final ya no pega el nombre al directorio
+    srv = OpcServer("opc.tcp://localhost:4848", "urn:test", FILES_DIR.rstrip("/"), "nodes.csv", "nodes.json")
+    assert srv._input_path == Path(FILES_DIR) / "nodes.csv"
+    assert srv._input_path.is_file()
+    assert srv._output_path.parent == Path(FILES_DIR)
+
+@pytest.fixture(scope="module")
+def resolved(tmp_path_factory: pytest.TempPathFactory):
+    # Un solo servidor resuelto para las pruebas de exportacion: crear el
+    # espacio de direcciones es lo que cuesta, no el socket
+    files = tmp_path_factory.mktemp("export")
+    shutil.copy(Path(FILES_DIR) / "nodes.csv", files / "nodes.csv")
+    srv = OpcServer("opc.tcp://127.0.0.1:4850", "urn:test", str(files), "nodes.csv", "nodes.json")
+    srv.resolve_nodes()
+    yield srv
+    srv.stop(clean=True)
+
+def test_export_replaces_json_atomically(resolved: OpcServer):
+    files = resolved._output_path.parent
+    resolved._output_path.write_text("{}", encoding="utf-8")
+    assert resolved.export_nodes_to_json().result() is None
+    data = json.loads(resolved._output_path.read_bytes())
+    assert data == resolved._export_dict
+    # Sin temporales olvidados junto al destino
+    assert sorted(p.name for p in files.iterdir()) == ["nodes.csv", "nodes.json"]
+
+def test_failed_export_keeps_previous_json(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    srv = OpcServer("opc.tcp://127.0.0.1:4850", "urn:test", str(tmp_path), "nodes.csv", "nodes.json")
+    (tmp_path / "nodes.json").write_text('{"Produccion": "ns=2;s=Produccion"}', encoding="utf-8")
+    def broken(src, dst):
+        raise OSError("disco lleno")
+    monkeypatch.setattr(os, "replace", broken)
+    with pytest.raises(OSError):
+        srv._write_export_atomic(b"{}")
+    # El archivo anterior sigue intacto y no queda el temporal
+    assert json.loads((tmp_path / "nodes.json").read_bytes()) == {"Produccion": "ns=2;s=Produccion"}
+    assert [p.name for p in tmp_path.iterdir()] == ["nodes.json"]
+
+def test_export_writes_in_background(resolved: OpcServer, monkeypatch: pytest.MonkeyPatch):
+    slow = OpcServer._write_export_atomic
+    def delayed(self, payload):
+        time.sleep(0.2)
+        slow(self, payload)
+    monkeypatch.setattr(OpcServer, "_write_export_atomic", delayed)
+    resolved._output_path.unlink(missing_ok=True)
+    pending = resolved.export_nodes_to_json()
+    # El llamante no espera a la escritura
+    assert not pending.done()
+    resolved._wait_export()
+    assert pending.done()
+    assert json.loads(resolved._output_path.read_bytes())
+
+def test_background_export_error_is_reported(resolved: OpcServer, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(resolved, "_output_path", resolved._output_path.parent / "missing" / "nodes.json")
+    with pytest.raises(OpcServerError, match="exportacion"):
+        resolved.export_nodes_to_json().result()
+
+def test_clean_stop_after_export(tmp_path: Path):
+    shutil.copy(Path(FILES_DIR) / "nodes.csv", tmp_path / "nodes.csv")
+    srv = OpcServer("opc.tcp://127.0.0.1:4852", "urn:test", str(tmp_path), "nodes.csv", "nodes.json")
+    srv.resolve_nodes()
+    pending = srv.export_nodes_to_json()
+    assert pending.result() is None
+    assert srv.stop(clean=True)
+    assert json.loads((tmp_path / "nodes.json").read_bytes())
+    # Segunda parada: no queda nada que detener
+    assert not srv.stop(clean=True)
+    # Tras recrear el servidor se puede volver a exportar
+    srv.create()
+    srv.resolve_nodes()
+    try:
+        assert srv.export_nodes_to_json().result() is None
+    finally:
+        srv.stop(clean=True)
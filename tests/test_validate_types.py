@@ -101,3 +101,67 @@ def test_double_ok_coma_decimal_and_default_zero():
     assert out2["datatype"] == ua.VariantType.Double
     assert out2["initial"] == pytest.approx(0.0)
     assert out2["writable"] is False
+
+def test_float_ok_and_invalid():
+    row = {
+        "alias": "Velocidad",
+        "nodeid": '""."X"."Velocidad"',
+        "datatype": "float",
+        "initial": "1,25",
+        "folder": "X",
+        "writable": "0",
+    }
+    out = validate_types(row)
+    assert out["datatype"] == ua.VariantType.Float
+    assert out["initial"] == pytest.approx(1.25)
+
+    row["datatype"] = "float"
+    row["initial"] = "rapido"
+    with pytest.raises(ValueError, match="no es float"):
+        validate_types(row)
+
+@pytest.mark.parametrize("dtype", ["UInt16", "uint16", "UINT16", " uInt16 "])
+def test_datatype_case_variants(dtype):
+    row = {
+        "alias": "Contador",
+        "nodeid": '""."X"."Contador"',
+        "datatype": dtype,
+        "initial": "7",
+        "folder": "X",
+        "writable": "TRUE",
+    }
+    out = validate_types(row)
+    assert out["datatype"] == ua.VariantType.UInt16
+    assert out["initial"] == 7
+    assert out["writable"] is True
+
+def test_boolean_mixed_case_and_invalid():
+    row = {
+        "alias": "Flag",
+        "nodeid": '""."X"."Flag"',
+        "datatype": "Boolean",
+        "initial": "fAlSe",
+        "folder": "X",
+        "writable": "Sí",
+    }
+    out = validate_types(row)
+    assert out["initial"] is False
+    assert out["writable"] is True
+
+    row.update(datatype="Boolean", initial="quizas", writable="0")
+    with pytest.raises(ValueError, match="no es booleano"):
+        validate_types(row)
+
+@pytest.mark.parametrize("raw, expected", [("on", True), ("OFF", False), ("Si", True)])
+def test_writable_on_off(raw: str, expected: bool):
+    row = {
+        "alias": "Flag",
+        "nodeid": '""."X"."Flag"',
+        "datatype": "boolean",
+        "initial": raw,
+        "folder": "X",
+        "writable": raw,
+    }
+    out = validate_types(row)
+    assert out["initial"] is expected
+    assert out["writable"] is expected